@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from core.testing import QueryBudgetMixin
+
+User = get_user_model()
+
+ABOUT_URLS = (reverse('about:author'), reverse('about:tech'))
+
+
+class AboutQueryBudgetTest(QueryBudgetMixin, TestCase):
+    def test_every_url_fits_query_budget(self):
+        self.assertUrlBudgets('about.urls', {
+            'author': (reverse('about:author'), 0),
+            'tech': (reverse('about:tech'), 0),
+        })
+
+
+class AboutPageCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_cached_hit_skips_rendering_and_database(self):
+        for url in ABOUT_URLS:
+            with self.subTest(url=url):
+                self.client.get(url)
+                with self.assertNumQueries(0):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                # Шаблон не рендерился: ответ целиком из кэша
+                self.assertEqual(response.templates, [])
+                self.assertIn('public', response['Cache-Control'])
+                self.assertIn(
+                    f'max-age={settings.ABOUT_CACHE_TIMEOUT}',
+                    response['Cache-Control'],
+                )
+                self.assertNotIn('sessionid', response.cookies)
+                self.assertIn('Cookie', response['Vary'])
+
+    def test_logged_in_user_gets_own_private_page(self):
+        url = ABOUT_URLS[0]
+        self.client.get(url)
+        user = User.objects.create_user(username='reader')
+        self.client.force_login(user)
+        response = self.client.get(url)
+        self.assertContains(response, 'Пользователь: reader')
+        self.assertIn('private', response['Cache-Control'])
+        self.client.logout()
+        self.assertNotContains(self.client.get(url), 'reader')
@@ -1,9 +1,19 @@
+from django.conf import settings
+from django.utils.decorators import method_decorator
 from django.views.generic.base import TemplateView
 
+from core.decorators import anonymous_cache_page
 
+cache_about_page = method_decorator(
+    anonymous_cache_page(settings.ABOUT_CACHE_TIMEOUT), name='dispatch'
+)
+
+
+@cache_about_page
 class AboutAuthorView(TemplateView):
     template_name = 'about/author.html'
 
 
+@cache_about_page
 class AboutTechView(TemplateView):
     template_name = 'about/tech.html'
@@ -0,0 +1,78 @@
+import json
+
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Group, Post, User
+
+POSTS_COUNT = 13
+LIMIT = 10
+
+
+class PostsApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='api_author')
+        cls.group = Group.objects.create(
+            title='Api group', slug='api-group', description='-'
+        )
+        for i in range(POSTS_COUNT):
+            Post.objects.create(
+                text=f'Api post {i}', author=cls.user, group=cls.group
+            )
+        cls.urls = [
+            reverse('api:posts'),
+            reverse('api:group_posts', kwargs={'slug': cls.group.slug}),
+            reverse(
+                'api:profile_posts', kwargs={'username': cls.user.username}
+            ),
+        ]
+
+    def get_json(self, url, params=None):
+        response = self.client.get(url, params or {})
+        self.assertTrue(response.streaming)
+        return json.loads(b''.join(response.streaming_content))
+
+    def test_cursor_pages_walk_whole_feed(self):
+        expected = list(Post.objects.values_list('pk', flat=True))
+        for url in self.urls:
+            with self.subTest(url=url):
+                first = self.get_json(url, {'limit': LIMIT})
+                self.assertEqual(len(first['results']), LIMIT)
+                second = self.get_json(
+                    url, {'limit': LIMIT, 'after': first['next']}
+                )
+                self.assertIsNone(second['next'])
+                self.assertEqual(
+                    [post['id'] for post in first['results']]
+                    + [post['id'] for post in second['results']],
+                    expected,
+                )
+
+    def test_page_is_read_in_one_query(self):
+        with self.assertNumQueries(1):
+            data = self.get_json(self.urls[0], {'limit': LIMIT})
+        self.assertEqual(
+            data['results'][0]['text'], f'Api post {POSTS_COUNT - 1}'
+        )
+
+    def test_fields_selection(self):
+        data = self.get_json(self.urls[0], {'fields': 'id,group'})
+        self.assertEqual(
+            data['results'][0],
+            {'id': Post.objects.first().pk, 'group': self.group.slug},
+        )
+
+    def test_bad_parameters_return_400(self):
+        for params in ({'fields': 'id,password'}, {'limit': 0},
+                       {'limit': 'many'}):
+            with self.subTest(params=params):
+                response = self.client.get(self.urls[0], params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+
+    def test_unknown_group_returns_404(self):
+        response = self.client.get(
+            reverse('api:group_posts', kwargs={'slug': 'missing'})
+        )
+        self.assertEqual(response.status_code, 404)
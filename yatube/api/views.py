@@ -0,0 +1,89 @@
+import json
+
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+
+from posts.models import Group, Post, User
+from posts.paginators import CursorPaginator, decode_cursor, encode_cursor
+
+POST_FIELDS = {
+    'id': lambda post: post.pk,
+    'text': lambda post: post.text,
+    'pub_date': lambda post: post.pub_date.isoformat(),
+    'author': lambda post: post.author.username,
+    'group': lambda post: post.group.slug if post.group else None,
+}
+ITERATOR_CHUNK_SIZE = 100
+
+
+class ApiError(Exception):
+    pass
+
+
+def parse_fields(request):
+    fields = request.GET.get('fields')
+    if not fields:
+        return list(POST_FIELDS)
+    fields = [field.strip() for field in fields.split(',') if field.strip()]
+    unknown = set(fields) - set(POST_FIELDS)
+    if unknown:
+        raise ApiError(f'Неизвестные поля: {", ".join(sorted(unknown))}')
+    return fields
+
+
+def parse_limit(request):
+    try:
+        limit = int(request.GET.get('limit', settings.POSTS_PER_PAGE))
+    except ValueError:
+        raise ApiError('limit должен быть числом')
+    if not 1 <= limit <= settings.API_MAX_LIMIT:
+        raise ApiError(f'limit должен быть от 1 до {settings.API_MAX_LIMIT}')
+    return limit
+
+
+def stream_page(queryset, after, fields, limit):
+    """Отдаёт страницу ленты кусками JSON, не собирая её в памяти.
+
+    Строки читаются итератором по limit + 1 штук: лишняя строка означает,
+    что есть следующая страница.
+    """
+    key = decode_cursor(after)
+    rows = CursorPaginator(queryset, limit).seek_after(key)[:limit + 1]
+    yield '{"results": ['
+    last = None
+    for number, post in enumerate(rows.iterator(ITERATOR_CHUNK_SIZE)):
+        if number == limit:
+            yield f'], "next": {json.dumps(encode_cursor(last))}}}'
+            return
+        item = {field: POST_FIELDS[field](post) for field in fields}
+        separator = ',' if last is not None else ''
+        yield separator + json.dumps(item, ensure_ascii=False)
+        last = post
+    yield '], "next": null}'
+
+
+def feed_response(request, queryset):
+    try:
+        fields = parse_fields(request)
+        limit = parse_limit(request)
+    except ApiError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    return StreamingHttpResponse(
+        stream_page(queryset, request.GET.get('after'), fields, limit),
+        content_type='application/json; charset=utf-8',
+    )
+
+
+def posts_list(request):
+    return feed_response(request, Post.objects.for_api())
+
+
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return feed_response(request, group.posts.for_api())
+
+
+def profile_posts(request, username):
+    author = get_object_or_404(User, username=username)
+    return feed_response(request, author.posts.for_api())
@@ -0,0 +1,41 @@
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.cache import cache_page
+
+
+def is_anonymous_request(request):
+    """Анонимность по cookie, не открывая сессию и не трогая БД."""
+    return not (
+        settings.SESSION_COOKIE_NAME in request.COOKIES
+        or CookieStorage.cookie_name in request.COOKIES
+    )
+
+
+def anonymous_cache_page(timeout):
+    """Полностраничный кэш для анонимов и долгий Cache-Control.
+
+    Запрос без cookie сессии и сообщений отдаётся из кэша до сессии,
+    пользователя и контекст-процессоров. Шапка у вошедших своя, поэтому
+    их страница рендерится как обычно и помечается private. Публичный
+    ответ зависит от cookie (Vary: Cookie).
+    """
+
+    def decorator(view):
+        cached_view = cache_page(timeout)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not is_anonymous_request(request):
+                response = view(request, *args, **kwargs)
+                patch_cache_control(response, private=True)
+                return response
+            response = cached_view(request, *args, **kwargs)
+            patch_cache_control(response, public=True, max_age=timeout)
+            # После входа браузер и CDN не должны отдавать копию для анонима
+            patch_vary_headers(response, ['Cookie'])
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,145 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+
+# Верхние границы корзин гистограмм; последняя корзина — всё, что больше
+TIME_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+METRICS = {
+    'total': TIME_BUCKETS,
+    'db': TIME_BUCKETS,
+    'template': TIME_BUCKETS,
+    'queries': QUERY_BUCKETS,
+}
+
+_state = threading.local()
+
+
+class RequestMetrics:
+    """Счётчики одного запроса: SQL-запросы и время БД и шаблонов в мс."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.template = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # Обёртка connection.execute_wrapper: время каждого SQL-запроса
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += (time.perf_counter() - started) * 1000
+            self.queries += 1
+
+    def collect(self):
+        """Контекст, в котором считаются запросы ко всем базам."""
+        stack = ExitStack()
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(self))
+        stack.callback(setattr, _state, 'metrics', None)
+        _state.metrics = self
+        return stack
+
+    def server_timing(self, total):
+        return ', '.join((
+            f'db;dur={self.db:.1f};desc="{self.queries} queries"',
+            f'template;dur={self.template:.1f}',
+            f'total;dur={total:.1f}',
+        ))
+
+
+def current_metrics():
+    return getattr(_state, 'metrics', None)
+
+
+class Histogram:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def as_dict(self):
+        labels = [str(bound) for bound in self.bounds] + ['+Inf']
+        return {
+            'buckets': dict(zip(labels, self.counts)),
+            'count': self.count,
+            'sum': round(self.sum, 3),
+        }
+
+
+class MetricsRegistry:
+    """Гистограммы метрик по именам view в памяти процесса."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.views = defaultdict(lambda: {
+                name: Histogram(bounds) for name, bounds in METRICS.items()
+            })
+
+    def record(self, view, metrics, total):
+        values = {
+            'total': total,
+            'db': metrics.db,
+            'template': metrics.template,
+            'queries': metrics.queries,
+        }
+        with self.lock:
+            histograms = self.views[view]
+            for name, value in values.items():
+                histograms[name].observe(value)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                view: {
+                    name: histogram.as_dict()
+                    for name, histogram in histograms.items()
+                }
+                for view, histograms in sorted(self.views.items())
+            }
+
+
+registry = MetricsRegistry()
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        metrics = current_metrics()
+        if metrics is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template += (time.perf_counter() - started) * 1000
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates, который засекает рендер при включённых метриках.
+
+    Вложенные шаблоны рендерятся внутри внешнего, поэтому время
+    не считается дважды.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
@@ -0,0 +1,92 @@
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .metrics import RequestMetrics, registry
+from .routers import pin_to_primary
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class PrimaryPinMiddleware:
+    """Закрепляет за primary пишущие запросы и следующие за ними.
+
+    После записи клиент получает cookie на REPLICA_PIN_SECONDS: пока она
+    жива, его чтения идут на primary, и автор сразу видит свой пост,
+    даже если реплика ещё не догнала.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.writes_to_primary = request.method not in SAFE_METHODS
+        pin_to_primary(
+            request.writes_to_primary
+            or settings.REPLICA_PIN_COOKIE in request.COOKIES
+        )
+        try:
+            response = self.get_response(request)
+        finally:
+            pin_to_primary(False)
+        if request.writes_to_primary:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE,
+                '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Подписка и отписка пишут на GET: см. writes_to_primary
+        if getattr(view_func, 'writes_to_primary', False):
+            request.writes_to_primary = True
+            pin_to_primary()
+
+
+class RequestMetricsMiddleware:
+    """Число и время SQL-запросов, время шаблонов и всего запроса.
+
+    Отдаёт их в заголовке Server-Timing и копит гистограммы по view
+    для /metrics/. При REQUEST_METRICS = False исключается из цепочки
+    при старте и ничего не стоит.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_METRICS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        started = time.perf_counter()
+        with metrics.collect():
+            response = self.get_response(request)
+        total = (time.perf_counter() - started) * 1000
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        # Заголовки уходят до тела: в Server-Timing потокового ответа
+        # только работа view, а гистограммы получат весь ответ
+        response['Server-Timing'] = metrics.server_timing(total)
+        if response.streaming:
+            response.streaming_content = self.stream(
+                response.streaming_content, metrics, view, started
+            )
+        else:
+            registry.record(view, metrics, total)
+        return response
+
+    def stream(self, content, metrics, view, started):
+        """Считает запросы, которые делает тело потокового ответа."""
+        try:
+            while True:
+                with metrics.collect():
+                    chunk = next(content, None)
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            total = (time.perf_counter() - started) * 1000
+            registry.record(view, metrics, total)
@@ -0,0 +1,66 @@
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+
+PRIMARY_DATABASE = 'default'
+REPLICA_DATABASE = 'replica'
+# Таблица DatabaseCache: версия лент читается сразу после записи
+CACHE_APP_LABEL = 'django_cache'
+
+_state = threading.local()
+
+
+def pin_to_primary(pinned=True):
+    _state.pinned = pinned
+
+
+def is_pinned_to_primary():
+    return getattr(_state, 'pinned', False)
+
+
+@contextmanager
+def use_primary():
+    """Чтения внутри блока идут на primary.
+
+    Для пересчётов и импорта, которые пишут по только что прочитанному:
+    реплика может отставать. Работает и как декоратор.
+    """
+    pinned = is_pinned_to_primary()
+    pin_to_primary()
+    try:
+        yield
+    finally:
+        pin_to_primary(pinned)
+
+
+def writes_to_primary(view):
+    """Помечает view, которое пишет и на безопасных методах.
+
+    PrimaryPinMiddleware закрепит такой запрос за primary и поставит
+    cookie, как после POST.
+    """
+    view.writes_to_primary = True
+    return view
+
+
+class PrimaryReplicaRouter:
+    """Чтения уходят на реплику, записи и закреплённые запросы — на primary.
+
+    Закрепление выставляет core.middleware.PrimaryPinMiddleware.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (
+            REPLICA_DATABASE not in settings.DATABASES
+            or is_pinned_to_primary()
+            or model._meta.app_label == CACHE_APP_LABEL
+        ):
+            return PRIMARY_DATABASE
+        return REPLICA_DATABASE
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY_DATABASE
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
@@ -0,0 +1,118 @@
+import os
+from collections import Counter
+from functools import wraps
+from importlib import import_module
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+# Замеры бенчмарков печатаются только по запросу: BENCHMARK_REPORT=1
+BENCHMARK_REPORT = bool(os.getenv('BENCHMARK_REPORT'))
+# Служебные запросы транзакций повторяются законно
+IGNORED_PREFIXES = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+
+
+def report(message):
+    if BENCHMARK_REPORT:
+        print(f'\n{message}')
+
+
+def find_duplicates(queries):
+    counts = Counter(
+        query['sql'] for query in queries
+        if not query['sql'].startswith(IGNORED_PREFIXES)
+    )
+    return {sql: count for sql, count in counts.items() if count > 1}
+
+
+class QueryBudgetContext(CaptureQueriesContext):
+    """Как assertNumQueries, но проверяет верхнюю границу и повторы.
+
+    Повтор одного и того же SQL с теми же параметрами почти всегда
+    означает N+1 или забытый кэш в шаблоне.
+    """
+
+    def __init__(self, test_case, budget, connection,
+                 allow_duplicates=False):
+        self.test_case = test_case
+        self.budget = budget
+        self.allow_duplicates = allow_duplicates
+        super().__init__(connection)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        super().__exit__(exc_type, exc_value, traceback)
+        if exc_type is not None:
+            return
+        queries = '\n'.join(
+            f'{number}. {query["sql"]}'
+            for number, query in enumerate(self.captured_queries, start=1)
+        )
+        self.test_case.assertLessEqual(
+            len(self), self.budget,
+            f'{len(self)} queries over budget {self.budget}:\n{queries}',
+        )
+        if not self.allow_duplicates:
+            duplicates = find_duplicates(self.captured_queries)
+            self.test_case.assertFalse(
+                duplicates,
+                'Duplicate queries:\n' + '\n'.join(
+                    f'{count}x {sql}' for sql, count in duplicates.items()
+                ),
+            )
+
+
+def query_budget(budget, using=DEFAULT_DB_ALIAS, allow_duplicates=False):
+    """Декоратор теста: весь тест укладывается в budget запросов."""
+    def decorator(test_method):
+        @wraps(test_method)
+        def wrapper(self, *args, **kwargs):
+            with QueryBudgetContext(
+                self, budget, connections[using], allow_duplicates
+            ):
+                return test_method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class QueryBudgetMixin:
+    """Проверки бюджета запросов для TestCase."""
+
+    def assertQueryBudget(self, budget, func=None, *args,
+                          using=DEFAULT_DB_ALIAS, allow_duplicates=False,
+                          **kwargs):
+        context = QueryBudgetContext(
+            self, budget, connections[using], allow_duplicates
+        )
+        if func is None:
+            return context
+        with context:
+            func(*args, **kwargs)
+
+    def get_with_budget(self, client, url, budget, **extra):
+        """GET с холодным кэшем, включая чтение потокового ответа."""
+        cache.clear()
+        with self.assertQueryBudget(budget):
+            response = client.get(url, **extra)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return response
+
+    def assertUrlBudgets(self, urlconf, budgets, client=None):
+        """Каждый именованный URL из urlconf обязан иметь бюджет.
+
+        budgets: имя URL -> (адрес, бюджет). Новый маршрут без бюджета
+        роняет тест, поэтому забыть про него нельзя.
+        """
+        names = {
+            pattern.name for pattern in import_module(urlconf).urlpatterns
+            if pattern.name
+        }
+        self.assertEqual(
+            names, set(budgets), f'Бюджеты запросов для {urlconf}'
+        )
+        client = client or self.client
+        for url, budget in budgets.values():
+            with self.subTest(url=url):
+                response = self.get_with_budget(client, url, budget)
+                self.assertLess(response.status_code, 400)
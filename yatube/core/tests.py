@@ -0,0 +1,256 @@
+import importlib
+import os
+import sys
+import time
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache.backends.db import DatabaseCache
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.db import connection
+from django.http import HttpResponse
+from django.template import engines
+from django.template.backends.django import DjangoTemplates
+from django.template.loaders.cached import Loader as CachedLoader
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+from .metrics import registry
+from .middleware import PrimaryPinMiddleware, RequestMetricsMiddleware
+from .routers import (PRIMARY_DATABASE, REPLICA_DATABASE,
+                      PrimaryReplicaRouter, use_primary)
+from .testing import QueryBudgetMixin, report
+from .templates import iter_template_names, warm_up_templates
+
+RENDERS = 200
+TEMPLATE_NAME = 'about/author.html'
+FILESYSTEM_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+
+def load_production_settings(**environ):
+    sys.modules.pop('yatube.settings_production', None)
+    with mock.patch.dict(os.environ, {'SECRET_KEY': 'test', **environ}):
+        return importlib.import_module('yatube.settings_production')
+
+
+def make_backend(loaders):
+    return DjangoTemplates({
+        'NAME': 'benchmark',
+        'DIRS': [settings.TEMPLATES_DIR],
+        'APP_DIRS': False,
+        'OPTIONS': {'loaders': loaders},
+    })
+
+
+def render_time(backend):
+    started = time.perf_counter()
+    for _ in range(RENDERS):
+        backend.get_template(TEMPLATE_NAME).render({})
+    return (time.perf_counter() - started) / RENDERS
+
+
+class TemplateWarmUpTest(TestCase):
+    def test_warm_up_compiles_every_project_template(self):
+        expected = len(list(iter_template_names(settings.TEMPLATES_DIR)))
+        self.assertGreater(expected, 0)
+        self.assertEqual(warm_up_templates(), expected)
+
+    def test_cached_loader_compiles_template_once(self):
+        plain = make_backend(FILESYSTEM_LOADERS)
+        cached = make_backend([
+            ('django.template.loaders.cached.Loader', FILESYSTEM_LOADERS),
+        ])
+        compiled = cached.get_template(TEMPLATE_NAME).template
+        self.assertIs(cached.get_template(TEMPLATE_NAME).template, compiled)
+        self.assertIsNot(
+            plain.get_template(TEMPLATE_NAME).template,
+            plain.get_template(TEMPLATE_NAME).template,
+        )
+        # Время только для отчёта: сравнение по часам нестабильно
+        plain_time = render_time(plain)
+        cached_time = render_time(cached)
+        report(
+            f'{TEMPLATE_NAME}: {plain_time * 1000:.3f} ms without '
+            f'cache, {cached_time * 1000:.3f} ms with cached loader'
+        )
+
+    def test_warm_up_fills_production_cached_loader(self):
+        production = load_production_settings()
+        with override_settings(TEMPLATES=production.TEMPLATES):
+            loader = engines.all()[0].engine.template_loaders[0]
+            self.assertIsInstance(loader, CachedLoader)
+            self.assertEqual(loader.get_template_cache, {})
+            compiled = warm_up_templates()
+            self.assertEqual(len(loader.get_template_cache), compiled)
+            self.assertIn(TEMPLATE_NAME, loader.get_template_cache)
+
+
+class ProductionCacheTest(TestCase):
+    def test_cache_is_shared_between_processes(self):
+        production = load_production_settings()
+        self.assertEqual(
+            production.CACHES['default']['BACKEND'],
+            'django.core.cache.backends.db.DatabaseCache',
+        )
+        self.assertEqual(production.THUMBNAIL_CACHE, 'default')
+        production = load_production_settings(
+            CACHE_BACKEND='memcached', CACHE_LOCATION='cache1:11211 cache2'
+        )
+        self.assertEqual(
+            production.CACHES['default']['LOCATION'],
+            ['cache1:11211', 'cache2'],
+        )
+
+    def test_process_local_cache_is_refused(self):
+        with self.assertRaises(ImproperlyConfigured):
+            load_production_settings(CACHE_BACKEND='locmem')
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Настройки соединения SQLite')
+class SQLitePragmasTest(TestCase):
+    def test_connection_uses_tuned_pragmas(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            synchronous = cursor.fetchone()[0]
+            cursor.execute('PRAGMA temp_store')
+            temp_store = cursor.fetchone()[0]
+        # NORMAL = 1, MEMORY = 2
+        self.assertEqual(synchronous, 1)
+        self.assertEqual(temp_store, 2)
+
+
+@mock.patch.dict(
+    settings.DATABASES, {REPLICA_DATABASE: settings.DATABASES['default']}
+)
+class PrimaryReplicaRoutingTest(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.router = PrimaryReplicaRouter()
+
+    def route_request(self, request):
+        databases = {}
+
+        def view(request):
+            databases['read'] = self.router.db_for_read(Post)
+            databases['write'] = self.router.db_for_write(Post)
+            return HttpResponse()
+
+        response = PrimaryPinMiddleware(view)(request)
+        return databases, response
+
+    def test_reads_go_to_replica(self):
+        databases, response = self.route_request(self.factory.get('/'))
+        self.assertEqual(databases['read'], REPLICA_DATABASE)
+        self.assertEqual(databases['write'], PRIMARY_DATABASE)
+        self.assertNotIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+
+    def test_write_request_pins_following_reads_to_primary(self):
+        databases, response = self.route_request(
+            self.factory.post('/create/')
+        )
+        self.assertEqual(databases['read'], PRIMARY_DATABASE)
+        self.assertIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+        request = self.factory.get('/')
+        request.COOKIES[settings.REPLICA_PIN_COOKIE] = '1'
+        databases, _ = self.route_request(request)
+        self.assertEqual(databases['read'], PRIMARY_DATABASE)
+        self.assertEqual(self.router.db_for_read(Post), REPLICA_DATABASE)
+
+    def test_cache_table_reads_use_primary(self):
+        entry = DatabaseCache('yatube_cache', {}).cache_model_class
+        self.assertEqual(self.router.db_for_read(entry), PRIMARY_DATABASE)
+
+    def test_maintenance_reads_use_primary(self):
+        with use_primary():
+            self.assertEqual(self.router.db_for_read(Post), PRIMARY_DATABASE)
+        self.assertEqual(self.router.db_for_read(Post), REPLICA_DATABASE)
+
+
+class WritingViewPinTest(TestCase):
+    def test_follow_on_get_sets_pin_cookie(self):
+        User = get_user_model()
+        User.objects.create_user(username='author')
+        self.client.force_login(User.objects.create_user(username='reader'))
+        response = self.client.get(
+            reverse('posts:profile_follow', args=['author'])
+        )
+        self.assertIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+        response = self.client.get(reverse('about:author'))
+        self.assertNotIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+
+
+@override_settings(REQUEST_METRICS=True)
+class RequestMetricsTest(TestCase):
+    def setUp(self):
+        registry.reset()
+        self.admin = get_user_model().objects.create_superuser(
+            username='admin', email='admin@example.com', password='admin'
+        )
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertRegex(
+            response['Server-Timing'],
+            r'^db;dur=[\d.]+;desc="\d+ queries", '
+            r'template;dur=[\d.]+, total;dur=[\d.]+$',
+        )
+
+    def test_metrics_endpoint_aggregates_views_for_staff_only(self):
+        for _ in range(3):
+            self.client.get(reverse('posts:index'))
+        response = self.client.get(reverse('metrics'))
+        self.assertRedirects(
+            response, f"{reverse('admin:login')}?next={reverse('metrics')}"
+        )
+        self.client.force_login(self.admin)
+        data = self.client.get(reverse('metrics')).json()
+        self.assertTrue(data['enabled'])
+        index = data['views']['posts:index']
+        self.assertEqual(index['total']['count'], 3)
+        self.assertEqual(sum(index['queries']['buckets'].values()), 3)
+        self.assertGreater(index['template']['sum'], 0)
+
+    def test_streaming_body_queries_are_counted(self):
+        response = self.client.get(reverse('api:posts'))
+        self.assertIn('Server-Timing', response)
+        self.assertNotIn('api:posts', registry.snapshot())
+        b''.join(response.streaming_content)
+        queries = registry.snapshot()['api:posts']['queries']
+        self.assertEqual(queries['count'], 1)
+        self.assertGreaterEqual(queries['sum'], 1)
+
+    @override_settings(REQUEST_METRICS=False)
+    def test_disabled_middleware_leaves_the_chain(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            RequestMetricsMiddleware(HttpResponse)
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn('Server-Timing', response)
+
+
+class QueryBudgetHelperTest(QueryBudgetMixin, TestCase):
+    def test_over_budget_fails(self):
+        with self.assertRaisesMessage(AssertionError, 'over budget 1'):
+            with self.assertQueryBudget(1):
+                Post.objects.count()
+                Post.objects.exists()
+
+    def test_duplicate_queries_fail(self):
+        with self.assertRaisesMessage(AssertionError, 'Duplicate queries'):
+            with self.assertQueryBudget(5):
+                Post.objects.count()
+                Post.objects.count()
+        with self.assertQueryBudget(5, allow_duplicates=True):
+            Post.objects.count()
+            Post.objects.count()
+
+    def test_url_without_budget_fails(self):
+        with self.assertRaisesMessage(AssertionError, 'about.urls'):
+            self.assertUrlBudgets('about.urls', {
+                'author': (reverse('about:author'), 0),
+            })
@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+
+from .metrics import METRICS, registry
+
+
+@staff_member_required
+def metrics(request):
+    """Гистограммы метрик запросов по view с момента старта процесса."""
+    return JsonResponse({
+        'enabled': settings.REQUEST_METRICS,
+        'units': {
+            name: 'queries' if name == 'queries' else 'ms'
+            for name in METRICS
+        },
+        'views': registry.snapshot(),
+    }, json_dumps_params={'ensure_ascii': False})
@@ -1,8 +1,46 @@
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 
-from .models import Group, Post
+from .models import Follow, Group, Post
 
 CONS = '-пусто-'
+# Меньше этого числа строк таблицу дешевле посчитать точно
+EXACT_COUNT_LIMIT = 10_000
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор, который не делает COUNT(*) по всей большой таблице."""
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if queryset.query.where:
+            return super().count
+        estimate = estimate_table_rows(queryset)
+        if estimate is None or estimate < EXACT_COUNT_LIMIT:
+            return super().count
+        return estimate
+
+
+def estimate_table_rows(queryset):
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                [table],
+            )
+        elif connection.vendor == 'sqlite':
+            # max(rowid) берётся из B-дерева за O(log n); удаления
+            # делают его оценкой сверху
+            cursor.execute(f'SELECT max(rowid) FROM {table}')
+        else:
+            return None
+        row = cursor.fetchone()
+    return row[0] if row else None
 
 
 @admin.register(Post)
@@ -15,9 +53,23 @@ class PostAdmin(admin.ModelAdmin):
         'group',
     )
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
     empty_value_display = CONS
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        formfield = super().formfield_for_foreignkey(
+            db_field, request, **kwargs
+        )
+        if db_field.name == 'group':
+            # Один запрос за список групп на всю страницу, а не на строку
+            if not hasattr(request, '_group_choices'):
+                request._group_choices = list(iter(formfield.choices))
+            formfield.choices = request._group_choices
+        return formfield
 
 
 @admin.register(Group)
@@ -29,3 +81,15 @@ class GroupAdmin(admin.ModelAdmin):
         'description',
     )
     empty_value_display = CONS
+
+
+@admin.register(Follow)
+class FollowAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'user',
+        'author',
+    )
+    list_select_related = ('user', 'author')
+    raw_id_fields = ('user', 'author')
+    empty_value_display = CONS
@@ -0,0 +1,21 @@
+import time
+
+from django.core.cache import cache
+
+FEED_VERSION_KEY = 'posts:feed_version'
+
+
+def new_feed_version():
+    return time.time_ns()
+
+
+def get_feed_version():
+    return cache.get_or_set(FEED_VERSION_KEY, new_feed_version, None)
+
+
+def bump_feed_version():
+    try:
+        cache.incr(FEED_VERSION_KEY)
+    except ValueError:
+        # Ключ вытеснен из кэша: новая версия не совпадёт ни с одной старой
+        cache.set(FEED_VERSION_KEY, new_feed_version(), None)
@@ -0,0 +1,70 @@
+import hashlib
+
+from django.views.decorators.http import condition
+
+from .markers import (INDEX_FEED, author_feed, get_feed_changed_at,
+                      group_feed)
+from .models import Group, Post, User
+
+
+def index_last_modified(request):
+    return get_feed_changed_at(INDEX_FEED)
+
+
+def group_last_modified(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True
+    ).first()
+    if group_id is None:
+        return None
+    return get_feed_changed_at(group_feed(group_id))
+
+
+def profile_last_modified(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True
+    ).first()
+    if author_id is None:
+        return None
+    return get_feed_changed_at(author_feed(author_id))
+
+
+def post_last_modified(request, post_id):
+    post = Post.objects.filter(pk=post_id).values(
+        'updated_at', 'author_id'
+    ).first()
+    if post is None:
+        return None
+    # На странице поста есть счётчик постов автора
+    author_changed_at = get_feed_changed_at(author_feed(post['author_id']))
+    if author_changed_at is None:
+        return post['updated_at']
+    return max(post['updated_at'], author_changed_at)
+
+
+def conditional_page(last_modified_func):
+    """Отвечает 304 на повторный запрос неизменившейся страницы.
+
+    Last-Modified — время последнего изменения ленты или поста (см.
+    posts.markers). ETag дополнительно учитывает пользователя и параметры
+    страницы: шапка у каждого пользователя своя.
+    """
+
+    def get_last_modified(request, *args, **kwargs):
+        if not hasattr(request, '_last_modified'):
+            request._last_modified = last_modified_func(
+                request, *args, **kwargs
+            )
+        return request._last_modified
+
+    def get_etag(request, *args, **kwargs):
+        last_modified = get_last_modified(request, *args, **kwargs)
+        if last_modified is None:
+            return None
+        key = (
+            f'{last_modified.isoformat()}:'
+            f'{request.user.pk}:{request.get_full_path()}'
+        )
+        return hashlib.md5(key.encode()).hexdigest()
+
+    return condition(etag_func=get_etag, last_modified_func=get_last_modified)
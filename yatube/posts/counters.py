@@ -0,0 +1,73 @@
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from core.routers import use_primary
+
+from .models import AuthorCounter, Follow, Group, Post, User
+
+
+def change_author_counter(author_id, field, delta):
+    if delta > 0:
+        # Первые посты автора могут создаваться одновременно: строку
+        # вставляет тот, кто успел, у остальных вставка пропускается
+        AuthorCounter.objects.bulk_create(
+            [AuthorCounter(author_id=author_id)], ignore_conflicts=True
+        )
+    # Не ниже нуля: при каскадном удалении автора строка счётчика уже
+    # удалена, а посты без счётчика (bulk_create) уменьшать некуда
+    AuthorCounter.objects.filter(author_id=author_id).update(
+        **{field: Greatest(F(field) + delta, 0)}
+    )
+
+
+def change_author_count(author_id, delta):
+    change_author_counter(author_id, 'posts_count', delta)
+
+
+def change_followers_count(author_id, delta):
+    change_author_counter(author_id, 'followers_count', delta)
+
+
+def change_group_count(group_id, delta):
+    if group_id is None:
+        return
+    Group.objects.filter(pk=group_id).update(
+        posts_count=Greatest(F('posts_count') + delta, 0)
+    )
+
+
+def get_author_posts_count(author):
+    return AuthorCounter.objects.filter(author=author).values_list(
+        'posts_count', flat=True
+    ).first() or 0
+
+
+@use_primary()
+def rebuild_post_counters():
+    """Пересчитывает счётчики постов и подписчиков авторов."""
+    counters = {}
+    with transaction.atomic():
+        for model, field in (
+            (Post, 'posts_count'), (Follow, 'followers_count')
+        ):
+            for row in model.objects.order_by().values('author').annotate(
+                total=Count('pk')
+            ):
+                counter = counters.setdefault(
+                    row['author'], AuthorCounter(author_id=row['author'])
+                )
+                setattr(counter, field, row['total'])
+        AuthorCounter.objects.all().delete()
+        AuthorCounter.objects.bulk_create(counters.values())
+        Group.objects.update(posts_count=0)
+        for row in Post.objects.order_by().filter(
+            group__isnull=False
+        ).values('group').annotate(total=Count('pk')):
+            Group.objects.filter(pk=row['group']).update(
+                posts_count=row['total']
+            )
+    return (
+        User.objects.filter(post_counter__posts_count__gt=0).count(),
+        Group.objects.filter(posts_count__gt=0).count(),
+    )
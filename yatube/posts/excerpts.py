@@ -0,0 +1,38 @@
+from django.db import transaction
+
+from core.routers import use_primary
+
+from .cache import bump_feed_version
+from .models import Post
+
+BATCH_SIZE = 5000
+
+
+@use_primary()
+def rebuild_excerpts(batch_size=BATCH_SIZE):
+    """Пересчитывает начала и HTML постов, например после смены правил.
+
+    Пишутся только изменившиеся строки; updated_at не трогается, чтобы
+    не сбивать маркеры лент и условные ответы. Возвращает число
+    обновлённых постов.
+    """
+    fields = Post.RENDERED_FIELDS
+    posts = Post.objects.order_by().only('text', *fields)
+    updated = 0
+    batch = []
+    with transaction.atomic():
+        for post in posts.iterator():
+            stored = [getattr(post, field) for field in fields]
+            post.fill_rendered()
+            if stored == [getattr(post, field) for field in fields]:
+                continue
+            batch.append(post)
+            if len(batch) == batch_size:
+                Post.objects.bulk_update(batch, fields)
+                updated += len(batch)
+                batch = []
+        Post.objects.bulk_update(batch, fields)
+    updated += len(batch)
+    if updated:
+        bump_feed_version()
+    return updated
@@ -0,0 +1,67 @@
+import csv
+import datetime
+import json
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Post
+
+EXPORT_FORMATS = ('ndjson', 'csv')
+EXPORT_COLUMNS = ('id', 'text', 'pub_date', 'author', 'group')
+EXPORT_VALUES = ('pk', 'text', 'pub_date', 'author__username', 'group__slug')
+CHUNK_SIZE = 2000
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+def parse_bound(value):
+    """Разбирает дату или дату со временем; даты без зоны считаются UTC."""
+    if not value:
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'Неверная дата: {value}')
+        moment = datetime.datetime.combine(day, datetime.time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment, timezone.utc)
+    return moment
+
+
+def filter_posts(group=None, author=None, since=None, until=None):
+    queryset = Post.objects.order_by('pk')
+    if group:
+        queryset = queryset.filter(group__slug=group)
+    if author:
+        queryset = queryset.filter(author__username=author)
+    if since:
+        queryset = queryset.filter(pub_date__gte=parse_bound(since))
+    if until:
+        queryset = queryset.filter(pub_date__lt=parse_bound(until))
+    return queryset
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def export_lines(queryset, export_format, chunk_size=CHUNK_SIZE):
+    """Строки выгрузки по одной: кортежи читаются итератором кусками."""
+    rows = queryset.values_list(*EXPORT_VALUES).iterator(chunk_size)
+    if export_format == 'csv':
+        writer = csv.writer(Echo())
+        yield writer.writerow(EXPORT_COLUMNS)
+        for row in rows:
+            yield writer.writerow(
+                row[:2] + (row[2].isoformat(),) + row[3:]
+            )
+        return
+    for row in rows:
+        item = dict(zip(EXPORT_COLUMNS, row))
+        item['pub_date'] = item['pub_date'].isoformat()
+        yield json.dumps(item, ensure_ascii=False) + '\n'
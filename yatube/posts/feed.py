@@ -0,0 +1,153 @@
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from core.routers import use_primary
+
+from .cache import get_feed_version
+from .models import FeedEntry, Post
+
+# Версия лент меняется при любом изменении постов, включая импорт
+OLDER_COUNT_KEY = (
+    'posts:feed_older_count:{group_id}:{horizon:%Y%m%d}:{version}'
+)
+# Записи живут на сутки дольше горизонта: граница читающих сдвигается
+# раз в сутки, и в таблице всегда есть все посты новее неё
+TRIM_SLACK = timedelta(days=1)
+BATCH_SIZE = 5000
+
+
+def get_horizon():
+    """Граница ленты: посты новее неё читаются из FeedEntry.
+
+    Округлена до суток, чтобы ключ кэша счётчика старых постов жил
+    весь день. None — горизонт выключен, в таблице все посты.
+    """
+    days = settings.POSTS_FEED_HORIZON_DAYS
+    if days is None:
+        return None
+    today = timezone.localdate()
+    midnight = datetime.combine(today, time.min)
+    return timezone.make_aware(midnight) - timedelta(days=days)
+
+
+def store_feed_entry(post):
+    """Добавляет или обновляет запись поста в таблице ленты."""
+    fields = {
+        'pub_date': post.pub_date,
+        'author_id': post.author_id,
+        'group_id': post.group_id,
+    }
+    updated = FeedEntry.objects.filter(post_id=post.pk).update(**fields)
+    if not updated:
+        FeedEntry.objects.create(post_id=post.pk, **fields)
+
+
+def trim_feed():
+    """Удаляет записи старше горизонта; возвращает их число."""
+    horizon = get_horizon()
+    if horizon is None:
+        return 0
+    deleted, _ = FeedEntry.objects.filter(
+        pub_date__lt=horizon - TRIM_SLACK
+    ).delete()
+    return deleted
+
+
+@use_primary()
+def rebuild_feed_table():
+    """Заполняет таблицу ленты заново, например после импорта."""
+    posts = Post.objects.order_by().values_list(
+        'pk', 'pub_date', 'author_id', 'group_id'
+    )
+    horizon = get_horizon()
+    if horizon is not None:
+        posts = posts.filter(pub_date__gte=horizon - TRIM_SLACK)
+    created = 0
+    with transaction.atomic():
+        FeedEntry.objects.all().delete()
+        batch = []
+        for post_id, pub_date, author_id, group_id in posts.iterator():
+            batch.append(FeedEntry(
+                post_id=post_id,
+                pub_date=pub_date,
+                author_id=author_id,
+                group_id=group_id,
+            ))
+            if len(batch) == BATCH_SIZE:
+                FeedEntry.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        FeedEntry.objects.bulk_create(batch)
+    return created + len(batch)
+
+
+class MaterializedFeed:
+    """Общая лента или лента группы поверх таблицы FeedEntry.
+
+    Посты новее горизонта выбираются из узкой таблицы по индексу
+    (group, -pub_date), и только потом по первичному ключу подтягиваются
+    их строки из posts_post. Страницы глубже горизонта дочитываются
+    из posts_post.
+    Как и SearchResults, поддерживает count() и срезы для Paginator.
+    """
+
+    def __init__(self, group_id=None):
+        self.group_id = group_id
+        self.horizon = get_horizon()
+
+    def entries(self):
+        entries = FeedEntry.objects.all()
+        if self.group_id is not None:
+            entries = entries.filter(group_id=self.group_id)
+        if self.horizon is not None:
+            entries = entries.filter(pub_date__gte=self.horizon)
+        return entries.order_by('-pub_date', '-post_id')
+
+    def older_posts(self):
+        posts = Post.objects.for_feed().filter(pub_date__lt=self.horizon)
+        if self.group_id is not None:
+            posts = posts.filter(group_id=self.group_id)
+        return posts
+
+    def table_count(self):
+        if not hasattr(self, '_table_count'):
+            self._table_count = self.entries().count()
+        return self._table_count
+
+    def older_count(self):
+        if self.horizon is None:
+            return 0
+        return cache.get_or_set(
+            OLDER_COUNT_KEY.format(
+                group_id=self.group_id,
+                horizon=self.horizon,
+                version=get_feed_version(),
+            ),
+            lambda: self.older_posts().count(),
+            settings.POSTS_CACHE_TIMEOUT,
+        )
+
+    def count(self):
+        return self.table_count() + self.older_count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        stop = index.stop
+        table_count = self.table_count()
+        posts = []
+        if start < table_count:
+            # Один запрос: срез узкой таблицы уходит подзапросом с LIMIT
+            posts = list(Post.objects.for_feed().filter(
+                pk__in=self.entries().values('post_id')[start:stop]
+            ))
+        if self.horizon is not None and stop > table_count:
+            posts += list(self.older_posts()[
+                max(start - table_count, 0):stop - table_count
+            ])
+        return posts
@@ -1,4 +1,8 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
 from django.forms import ModelForm
+from django.template.defaultfilters import filesizeformat
 
 from .models import Post
 
@@ -6,6 +10,21 @@ from .models import Post
 class PostForm(ModelForm):
     class Meta:
         model = Post
-        labels = {'group': 'Группа', 'text': 'Сообщение'}
+        labels = {
+            'group': 'Группа', 'text': 'Сообщение', 'image': 'Картинка',
+        }
         texts = {'group': 'Выберете группу', 'text': 'Введите сообщение'}
-        fields = ['group', 'text']
+        fields = ['group', 'text', 'image']
+
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        # Размер новой загрузки известен без чтения файла
+        if (
+            isinstance(image, UploadedFile)
+            and image.size > settings.POSTS_IMAGE_MAX_SIZE
+        ):
+            raise ValidationError(
+                'Картинка больше '
+                f'{filesizeformat(settings.POSTS_IMAGE_MAX_SIZE)}'
+            )
+        return image
@@ -0,0 +1,95 @@
+import random
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+from faker import Faker
+
+from .imports import BATCH_SIZE, PostImporter
+from .models import Group, User
+
+GENERATED_PREFIX = 'gen'
+NO_GROUP_SHARE = 0.3
+HISTORY_DAYS = 365
+
+
+def zipf_weights(size, skew):
+    """Накопленные веса закона Ципфа: первые элементы встречаются чаще."""
+    return list(accumulate(1 / rank ** skew for rank in range(1, size + 1)))
+
+
+class DataGenerator:
+    """Воспроизводимые тестовые данные для нагрузки.
+
+    Авторы и группы выбираются по закону Ципфа: несколько самых активных
+    пишут большую часть постов, как на живом сайте. Посты пишутся через
+    PostImporter, поэтому счётчики, маркеры и индекс пересчитываются разом.
+    """
+
+    def __init__(self, seed=0, skew=1.1, locale='ru_RU'):
+        self.random = random.Random(seed)
+        self.faker = Faker(locale)
+        self.faker.seed_instance(seed)
+        self.skew = skew
+
+    def create_users(self, count):
+        password = make_password(None)
+        users = [
+            User(
+                username=f'{GENERATED_PREFIX}_{i}_{self.faker.user_name()}',
+                first_name=self.faker.first_name(),
+                last_name=self.faker.last_name(),
+                password=password,
+            )
+            for i in range(count)
+        ]
+        User.objects.bulk_create(users, ignore_conflicts=True)
+        return [user.username for user in users]
+
+    def create_groups(self, count):
+        groups = []
+        for i in range(count):
+            title = self.faker.catch_phrase()[:200]
+            groups.append(Group(
+                title=title,
+                slug=f'{GENERATED_PREFIX}-{i}',
+                description=self.faker.paragraph(),
+            ))
+        Group.objects.bulk_create(groups, ignore_conflicts=True)
+        return [group.slug for group in groups]
+
+    def iter_rows(self, count, authors, groups):
+        author_weights = zipf_weights(len(authors), self.skew)
+        group_weights = zipf_weights(len(groups), self.skew)
+        now = timezone.now()
+        for _ in range(count):
+            group = None
+            if groups and self.random.random() >= NO_GROUP_SHARE:
+                group = self.random.choices(
+                    groups, cum_weights=group_weights
+                )[0]
+            pub_date = now - timedelta(
+                seconds=self.random.randrange(HISTORY_DAYS * 24 * 3600)
+            )
+            yield {
+                'text': self.faker.paragraph(
+                    nb_sentences=self.random.randint(1, 12)
+                ),
+                'author': self.random.choices(
+                    authors, cum_weights=author_weights
+                )[0],
+                'group': group,
+                'pub_date': pub_date.isoformat(),
+            }
+
+    def generate(self, users, groups, posts, batch_size=BATCH_SIZE):
+        authors = self.create_users(users)
+        slugs = self.create_groups(groups)
+        importer = PostImporter(batch_size)
+        try:
+            yield from importer.import_rows(
+                self.iter_rows(posts, authors, slugs)
+            )
+        finally:
+            importer.finish()
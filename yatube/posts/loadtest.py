@@ -0,0 +1,153 @@
+import random
+import threading
+import time
+from collections import defaultdict
+from http import HTTPStatus
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Group, Post, User
+
+SCENARIOS = ('index', 'group_posts', 'profile', 'post_detail', 'post_create')
+PERCENTILES = (50, 95, 99)
+SAMPLE_SIZE = 1000
+
+
+def percentile(values, percent):
+    """Перцентиль методом ближайшего ранга."""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * percent // 100))
+    return ordered[rank - 1]
+
+
+class LoadTest:
+    """Гоняет запросы к страницам постов из нескольких потоков.
+
+    Каждый поток держит свой тестовый клиент: запрос проходит весь
+    WSGI-обработчик с middleware, а число SQL-запросов считается
+    на соединении потока.
+    """
+
+    def __init__(self, seed=0, scenarios=SCENARIOS):
+        self.random = random.Random(seed)
+        self.scenarios = scenarios
+        self.host = next(
+            (host for host in settings.ALLOWED_HOSTS if host != '*'),
+            'localhost',
+        )
+        self.usernames = list(
+            User.objects.filter(posts__isnull=False).distinct().values_list(
+                'username', flat=True
+            )[:SAMPLE_SIZE]
+        )
+        self.slugs = list(
+            Group.objects.exclude(slug='').values_list('slug', flat=True)[
+                :SAMPLE_SIZE
+            ]
+        )
+        self.post_ids = list(
+            Post.objects.values_list('pk', flat=True)[:SAMPLE_SIZE]
+        )
+        self.results = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def make_request(self, rnd, scenario):
+        page = {'page': rnd.randint(1, 5)}
+        if scenario == 'index':
+            return 'get', reverse('posts:index'), page
+        if scenario == 'group_posts':
+            return 'get', reverse(
+                'posts:group_posts', args=[rnd.choice(self.slugs)]
+            ), page
+        if scenario == 'profile':
+            return 'get', reverse(
+                'posts:profile', args=[rnd.choice(self.usernames)]
+            ), page
+        if scenario == 'post_detail':
+            return 'get', reverse(
+                'posts:post_detail', args=[rnd.choice(self.post_ids)]
+            ), {}
+        return 'post', reverse('posts:post_create'), {
+            'text': f'Load test post {rnd.random()}',
+        }
+
+    def available(self):
+        """Сценарии, для которых в базе есть данные."""
+        needs = {
+            'group_posts': self.slugs,
+            'profile': self.usernames,
+            'post_detail': self.post_ids,
+            'post_create': self.usernames,
+        }
+        return [
+            scenario for scenario in self.scenarios
+            if needs.get(scenario, True)
+        ]
+
+    def worker(self, seed, requests):
+        rnd = random.Random(seed)
+        client = Client(HTTP_HOST=self.host)
+        scenarios = self.available()
+        if 'post_create' in scenarios:
+            client.force_login(
+                User.objects.get(username=rnd.choice(self.usernames))
+            )
+        try:
+            for _ in range(requests):
+                scenario = rnd.choice(scenarios)
+                method, url, data = self.make_request(rnd, scenario)
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    try:
+                        status = getattr(client, method)(
+                            url, data
+                        ).status_code
+                    except Exception:
+                        status = HTTPStatus.INTERNAL_SERVER_ERROR
+                    elapsed = time.perf_counter() - started
+                with self.lock:
+                    if status >= HTTPStatus.BAD_REQUEST:
+                        self.errors[scenario] += 1
+                    self.results[scenario].append(
+                        (elapsed, len(queries))
+                    )
+        finally:
+            connection.close()
+
+    def run(self, threads, requests):
+        workers = [
+            threading.Thread(
+                target=self.worker,
+                args=(self.random.random(), requests),
+            )
+            for _ in range(threads)
+        ]
+        started = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return time.perf_counter() - started
+
+    def report(self):
+        """Строки отчёта: перцентили задержки в мс и запросы на запрос."""
+        for scenario in self.scenarios:
+            samples = self.results.get(scenario)
+            if not samples:
+                continue
+            timings = [elapsed * 1000 for elapsed, _ in samples]
+            queries = sum(count for _, count in samples) / len(samples)
+            latency = ', '.join(
+                f'p{percent} {percentile(timings, percent):.1f}ms'
+                for percent in PERCENTILES
+            )
+            yield (
+                f'{scenario}: {len(samples)} requests, {latency}, '
+                f'{queries:.1f} queries/request, '
+                f'{self.errors[scenario]} errors'
+            )
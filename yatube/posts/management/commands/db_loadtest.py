@@ -0,0 +1,72 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection
+
+from posts.models import Post, User
+
+LOADTEST_USERNAME = 'db_loadtest'
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест БД: параллельные создания постов и чтения ленты '
+        'на текущем бэкенде'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument(
+            '--operations', type=int, default=200,
+            help='Операций на каждый поток',
+        )
+
+    def handle(self, *args, **options):
+        author, _ = User.objects.get_or_create(username=LOADTEST_USERNAME)
+        results = {'write': [], 'read': [], 'errors': []}
+        lock = threading.Lock()
+
+        def worker(kind, operation):
+            done = 0
+            try:
+                for _ in range(options['operations']):
+                    try:
+                        operation()
+                        done += 1
+                    except DatabaseError as error:
+                        with lock:
+                            results['errors'].append(error)
+            finally:
+                connection.close()
+            with lock:
+                results[kind].append(done)
+
+        def write():
+            Post.objects.create(author=author, text='Load test post')
+
+        def read():
+            list(Post.objects.for_feed()[:10])
+
+        threads = [
+            threading.Thread(target=worker, args=('write', write))
+            for _ in range(options['writers'])
+        ] + [
+            threading.Thread(target=worker, args=('read', read))
+            for _ in range(options['readers'])
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f'{connection.vendor}: {elapsed:.2f}s, '
+            f'{sum(results["write"]) / elapsed:.0f} writes/s, '
+            f'{sum(results["read"]) / elapsed:.0f} reads/s, '
+            f'{len(results["errors"])} errors'
+        )
+        Post.objects.filter(author=author).delete()
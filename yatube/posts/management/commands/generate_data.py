@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.generator import DataGenerator
+from posts.imports import BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерирует воспроизводимые данные для нагрузочных тестов: '
+        'пользователей, группы и посты с неравномерным распределением'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=100_000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='Показатель закона Ципфа для авторов и групп',
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        generator = DataGenerator(options['seed'], options['skew'])
+        started = time.perf_counter()
+        generated = 0
+        for generated in generator.generate(
+            options['users'], options['groups'], options['posts'],
+            options['batch_size'],
+        ):
+            self.stdout.write(f'{generated} posts')
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Сгенерировано {generated} постов за {elapsed:.1f}s'
+        ))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.loadtest import SCENARIOS, LoadTest
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест страниц постов через WSGI-приложение: '
+        'перцентили задержки и число SQL-запросов на запрос'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Запросов на каждый поток',
+        )
+        parser.add_argument(
+            '--scenario', action='append', choices=SCENARIOS,
+            help='Сценарий; по умолчанию все',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        loadtest = LoadTest(
+            options['seed'], options['scenario'] or SCENARIOS
+        )
+        if not loadtest.post_ids:
+            raise CommandError('Нет постов: сначала запустите generate_data')
+        elapsed = loadtest.run(options['threads'], options['requests'])
+        total = options['threads'] * options['requests']
+        for line in loadtest.report():
+            self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} requests in {elapsed:.1f}s, '
+            f'{total / elapsed:.0f} requests/s'
+        ))
@@ -0,0 +1,45 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from posts.thumbnails import process_pending_thumbnails
+
+
+class Command(BaseCommand):
+    help = (
+        'Воркер миниатюр: делает миниатюры картинок новых постов вне '
+        'обработки запросов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Обработать очередь один раз и выйти',
+        )
+        parser.add_argument(
+            '--interval', type=float, default=5,
+            help='Пауза в секундах, когда очередь пуста',
+        )
+        parser.add_argument(
+            '--batch-size', type=int,
+            default=settings.POSTS_THUMBNAIL_BATCH_SIZE,
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            processed = process_pending_thumbnails(options['batch_size'])
+            total += processed
+            if processed:
+                self.stdout.write(f'{processed} posts')
+                continue
+            if options['once']:
+                break
+            # Не держим соединение открытым между проходами
+            connection.close()
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано картинок: {total}'
+        ))
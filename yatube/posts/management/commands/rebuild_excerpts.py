@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts.excerpts import rebuild_excerpts
+
+
+class Command(BaseCommand):
+    help = 'Заново сохраняет начала постов для лент и HTML постов'
+
+    def handle(self, *args, **options):
+        updated = rebuild_excerpts()
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлено начал постов: {updated}'
+        ))
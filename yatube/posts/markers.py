@@ -0,0 +1,84 @@
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from core.routers import use_primary
+
+from .models import FeedMarker, Post
+
+INDEX_FEED = 'index'
+
+
+def group_feed(group_id):
+    return f'group:{group_id}'
+
+
+def author_feed(author_id):
+    return f'author:{author_id}'
+
+
+def post_feeds(author_id, group_id):
+    keys = [INDEX_FEED, author_feed(author_id)]
+    if group_id is not None:
+        keys.append(group_feed(group_id))
+    return keys
+
+
+def author_posts_feeds(author_id):
+    """Ленты, где видны посты автора: при смене его имени."""
+    group_ids = Post.objects.order_by().filter(
+        author_id=author_id, group__isnull=False
+    ).values_list('group', flat=True).distinct()
+    return [INDEX_FEED, author_feed(author_id)] + [
+        group_feed(group_id) for group_id in group_ids
+    ]
+
+
+def group_posts_feeds(group_id):
+    """Ленты, где видны посты группы: при смене её данных."""
+    author_ids = Post.objects.order_by().filter(
+        group_id=group_id
+    ).values_list('author', flat=True).distinct()
+    return [INDEX_FEED, group_feed(group_id)] + [
+        author_feed(author_id) for author_id in author_ids
+    ]
+
+
+def touch_feeds(keys, changed_at=None):
+    changed_at = changed_at or timezone.now()
+    keys = set(keys)
+    updated = FeedMarker.objects.filter(key__in=keys).update(
+        changed_at=changed_at
+    )
+    if updated < len(keys):
+        FeedMarker.objects.bulk_create(
+            [FeedMarker(key=key, changed_at=changed_at) for key in keys],
+            ignore_conflicts=True,
+        )
+
+
+def get_feed_changed_at(key):
+    return FeedMarker.objects.filter(key=key).values_list(
+        'changed_at', flat=True
+    ).first()
+
+
+@use_primary()
+def rebuild_feed_markers():
+    """Пересчитывает маркеры по updated_at постов, например после импорта."""
+    markers = []
+    newest = Post.objects.aggregate(newest=Max('updated_at'))['newest']
+    if newest is not None:
+        markers.append(FeedMarker(key=INDEX_FEED, changed_at=newest))
+    for field, make_key in (('author', author_feed), ('group', group_feed)):
+        rows = Post.objects.order_by().filter(
+            **{f'{field}__isnull': False}
+        ).values(field).annotate(newest=Max('updated_at'))
+        markers.extend(
+            FeedMarker(key=make_key(row[field]), changed_at=row['newest'])
+            for row in rows
+        )
+    with transaction.atomic():
+        FeedMarker.objects.all().delete()
+        FeedMarker.objects.bulk_create(markers)
+    return len(markers)
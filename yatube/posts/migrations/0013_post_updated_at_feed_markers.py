@@ -0,0 +1,48 @@
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F, Max
+
+
+def fill_updated_at_and_markers(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    FeedMarker = apps.get_model('posts', 'FeedMarker')
+    Post.objects.update(updated_at=F('pub_date'))
+    markers = []
+    newest = Post.objects.aggregate(newest=Max('updated_at'))['newest']
+    if newest is not None:
+        markers.append(FeedMarker(key='index', changed_at=newest))
+    for field in ('author', 'group'):
+        rows = Post.objects.order_by().filter(
+            **{f'{field}__isnull': False}
+        ).values(field).annotate(newest=Max('updated_at'))
+        markers.extend(
+            FeedMarker(key=f'{field}:{row[field]}', changed_at=row['newest'])
+            for row in rows
+        )
+    FeedMarker.objects.bulk_create(markers)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_post_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.CreateModel(
+            name='FeedMarker',
+            fields=[
+                ('key', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('changed_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.RunPython(
+            fill_updated_at_and_markers, migrations.RunPython.noop
+        ),
+    ]
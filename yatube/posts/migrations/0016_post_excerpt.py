@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+BATCH_SIZE = 5000
+
+
+def make_excerpt(text):
+    # Копия posts.models.make_excerpt на момент миграции: код модели
+    # может измениться, а миграция должна давать тот же результат
+    excerpt = Truncator(text).chars(settings.POSTS_EXCERPT_LENGTH)
+    return excerpt, excerpt != text
+
+
+def fill_excerpts(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    batch = []
+    for pk, text in Post.objects.order_by().values_list(
+        'pk', 'text'
+    ).iterator():
+        excerpt, truncated = make_excerpt(text)
+        batch.append(Post(
+            pk=pk, excerpt=excerpt, excerpt_truncated=truncated
+        ))
+        if len(batch) == BATCH_SIZE:
+            Post.objects.bulk_update(batch, ['excerpt', 'excerpt_truncated'])
+            batch = []
+    Post.objects.bulk_update(batch, ['excerpt', 'excerpt_truncated'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_feed_entry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='excerpt_truncated',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(fill_excerpts, migrations.RunPython.noop),
+    ]
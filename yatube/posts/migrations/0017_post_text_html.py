@@ -0,0 +1,65 @@
+from django.db import migrations, models
+from django.template.defaultfilters import linebreaksbr
+from django.utils.html import conditional_escape
+from django.utils.text import Truncator
+
+BATCH_SIZE = 5000
+RENDERED_FIELDS = ('text_html', 'heading_html', 'html_version')
+RENDER_VERSION = 1
+HEADING_WORDS = 30
+
+
+def render_text(text):
+    # Копия posts.models.render_text версии 1: при смене правил модель
+    # поднимет RENDER_VERSION, а rebuild_excerpts перерисует посты
+    return (
+        linebreaksbr(text, autoescape=True),
+        conditional_escape(Truncator(text).words(HEADING_WORDS)),
+    )
+
+
+def fill_text_html(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    batch = []
+    for pk, text in Post.objects.order_by().values_list(
+        'pk', 'text'
+    ).iterator():
+        text_html, heading_html = render_text(text)
+        batch.append(Post(
+            pk=pk,
+            text_html=text_html,
+            heading_html=heading_html,
+            html_version=RENDER_VERSION,
+        ))
+        if len(batch) == BATCH_SIZE:
+            Post.objects.bulk_update(batch, RENDERED_FIELDS)
+            batch = []
+    Post.objects.bulk_update(batch, RENDERED_FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_post_excerpt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='text_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='heading_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='html_version',
+            field=models.PositiveSmallIntegerField(
+                default=0, editable=False
+            ),
+        ),
+        migrations.RunPython(fill_text_html, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_post_text_html'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, upload_to='posts/'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='thumbnail_status',
+            field=models.PositiveSmallIntegerField(
+                choices=[(0, 'ждут воркера'), (1, 'готовы'), (2, 'ошибка')],
+                default=0,
+                editable=False,
+            ),
+        ),
+    ]
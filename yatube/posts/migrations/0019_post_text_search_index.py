@@ -0,0 +1,32 @@
+from django.db import migrations
+
+# Копия posts.search.SEARCH_CONFIG: выражение индекса должно совпадать
+# с выражением в запросах поиска
+SEARCH_CONFIG = 'russian'
+INDEX_NAME = 'posts_post_text_search'
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX {INDEX_NAME} ON posts_post '
+        f"USING GIN (to_tsvector('{SEARCH_CONFIG}', text))"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_post_image'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
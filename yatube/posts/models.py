@@ -1,19 +1,80 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
+from django.template.defaultfilters import linebreaksbr
+from django.utils.html import conditional_escape
+from django.utils.safestring import mark_safe
+from django.utils.text import Truncator
 
 User = get_user_model()
 
+# Меняется вместе с правилами render_text: сохранённый HTML старой
+# версии не показывается, а посты перерисовывает rebuild_excerpts
+RENDER_VERSION = 1
+HEADING_WORDS = 30
+
+
+def make_excerpt(text, length=None):
+    """Начало текста для лент и признак того, что текст обрезан."""
+    length = length or settings.POSTS_EXCERPT_LENGTH
+    excerpt = Truncator(text).chars(length)
+    return excerpt, excerpt != text
+
+
+def render_text(text):
+    """Безопасный HTML тела поста и заголовок страницы поста."""
+    return (
+        linebreaksbr(text, autoescape=True),
+        conditional_escape(Truncator(text).words(HEADING_WORDS)),
+    )
+
 
 class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     description = models.TextField()
+    posts_count = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    FEED_FIELDS = (
+        'pk',
+        'excerpt',
+        'excerpt_truncated',
+        'pub_date',
+        'updated_at',
+        'author',
+        'author__username',
+        'author__first_name',
+        'author__last_name',
+        'group',
+        'group__slug',
+        'image',
+        'thumbnail_status',
+    )
+
+    def for_feed(self):
+        # Полный текст в лентах не нужен: хватает сохранённого начала
+        return self.select_related('author', 'group').only(*self.FEED_FIELDS)
+
+    def for_api(self):
+        # API отдаёт полный текст, в отличие от HTML-лент
+        return self.for_feed().only(*self.FEED_FIELDS, 'text')
+
+
 class Post(models.Model):
+    THUMBNAILS_PENDING = 0
+    THUMBNAILS_READY = 1
+    THUMBNAILS_FAILED = 2
+    THUMBNAIL_STATUSES = (
+        (THUMBNAILS_PENDING, 'ждут воркера'),
+        (THUMBNAILS_READY, 'готовы'),
+        (THUMBNAILS_FAILED, 'ошибка'),
+    )
+
     group = models.ForeignKey(
         Group,
         blank=True,
@@ -22,15 +83,236 @@ class Post(models.Model):
         on_delete=models.SET_NULL
     )
     text = models.TextField()
+    excerpt = models.TextField(blank=True, editable=False)
+    excerpt_truncated = models.BooleanField(default=False, editable=False)
+    text_html = models.TextField(blank=True, editable=False)
+    heading_html = models.TextField(blank=True, editable=False)
+    html_version = models.PositiveSmallIntegerField(
+        default=0, editable=False
+    )
     pub_date = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
         related_name='posts'
     )
+    image = models.ImageField(upload_to='posts/', blank=True)
+    thumbnail_status = models.PositiveSmallIntegerField(
+        choices=THUMBNAIL_STATUSES,
+        default=THUMBNAILS_PENDING,
+        editable=False,
+    )
+
+    objects = PostQuerySet.as_manager()
+
+    # Поля, которые вычисляются из text при сохранении
+    RENDERED_FIELDS = (
+        'excerpt', 'excerpt_truncated', 'text_html', 'heading_html',
+        'html_version',
+    )
 
     class Meta:
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-pk']
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date_idx',
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx',
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
+
+    def fill_rendered(self):
+        self.excerpt, self.excerpt_truncated = make_excerpt(self.text)
+        self.text_html, self.heading_html = render_text(self.text)
+        self.html_version = RENDER_VERSION
+
+    def get_rendered(self):
+        if self.html_version != RENDER_VERSION:
+            # До rebuild_excerpts HTML рисуется на лету по новым правилам
+            return render_text(self.text)
+        return mark_safe(self.text_html), mark_safe(self.heading_html)
+
+    @property
+    def body_html(self):
+        return self.get_rendered()[0]
+
+    @property
+    def heading(self):
+        return self.get_rendered()[1]
+
+    @property
+    def fragment_key(self):
+        """Ключ фрагментного кэша поста.
+
+        Меняется при каждом сохранении поста, а также при смене имени
+        автора и адреса группы, которые показаны во фрагменте.
+        """
+        return ':'.join(map(str, (
+            self.pk,
+            self.updated_at.timestamp(),
+            RENDER_VERSION,
+            self.author.username,
+            self.author.get_full_name(),
+            self.group.slug if self.group_id else '',
+        )))
+
+    @property
+    def thumbnails_ready(self):
+        return self.thumbnail_status == self.THUMBNAILS_READY
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'text' in update_fields:
+            self.fill_rendered()
+            if update_fields is not None:
+                update_fields = kwargs['update_fields'] = {
+                    *update_fields, *self.RENDERED_FIELDS, 'updated_at'
+                }
+        if update_fields is None or 'image' in update_fields:
+            # Новый файл ещё не записан в хранилище: миниатюры для него
+            # сделает воркер process_thumbnails
+            if not self.image._committed:
+                self.thumbnail_status = self.THUMBNAILS_PENDING
+                if update_fields is not None:
+                    kwargs['update_fields'] = {
+                        *update_fields, 'thumbnail_status'
+                    }
+        # Счётчики постов обновляются в post_save той же транзакцией
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+class AuthorCounter(models.Model):
+    author = models.OneToOneField(
+        User,
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name='post_counter'
+    )
+    posts_count = models.PositiveIntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.author}: {self.posts_count}'
+
+
+class Follow(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follower'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='following'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'], name='unique_follow'
+            ),
+            models.CheckConstraint(
+                check=~models.Q(user=models.F('author')),
+                name='no_self_follow',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user} -> {self.author}'
+
+
+class TimelineEntry(models.Model):
+    """Пост в ленте подписчика, записанный при публикации (fan-out)."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_timeline_post'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx',
+            ),
+        ]
+
+
+class FeedEntry(models.Model):
+    """Узкая копия свежего поста для общей ленты и лент групп.
+
+    Без текста и прочих широких колонок: страница ленты читается
+    из маленькой плотной таблицы. Старше горизонта записи удаляются.
+    """
+    post = models.OneToOneField(
+        Post,
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name='feed_entry'
+    )
+    pub_date = models.DateTimeField()
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    group = models.ForeignKey(
+        Group,
+        blank=True,
+        null=True,
+        on_delete=models.SET_NULL,
+        related_name='+'
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-post'],
+                name='feed_pub_date_idx',
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-post'],
+                name='feed_group_pub_date_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id}: {self.pub_date}'
+
+
+class FeedMarker(models.Model):
+    """Время последнего изменения ленты: общей, группы или автора."""
+    key = models.CharField(max_length=64, primary_key=True)
+    changed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f'{self.key}: {self.changed_at}'
@@ -0,0 +1,133 @@
+import base64
+import binascii
+from collections.abc import Sequence
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+CURSOR_SEPARATOR = '|'
+
+
+def encode_cursor(post):
+    """Упаковывает позицию поста (pub_date, id) в токен для URL."""
+    raw = f'{post.pub_date.isoformat()}{CURSOR_SEPARATOR}{post.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Распаковывает токен; для битого токена возвращает None."""
+    if not token:
+        return None
+    try:
+        padding = '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(token + padding).decode()
+        pub_date, pk = raw.rsplit(CURSOR_SEPARATOR, 1)
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if pub_date is None:
+        return None
+    return pub_date, pk
+
+
+class CursorPage(Sequence):
+    """Страница ленты, полученная поиском по ключу (pub_date, id).
+
+    Повторяет ту часть интерфейса django.core.paginator.Page, которой
+    пользуются шаблоны, но не знает ни номера страницы, ни их количества.
+    """
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self.object_list)} posts>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def next_cursor(self):
+        if not self.has_next() or not self.object_list:
+            return None
+        return encode_cursor(self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous() or not self.object_list:
+            return None
+        return encode_cursor(self.object_list[0])
+
+
+class CursorPaginator:
+    """Пагинатор по ключу (pub_date, id) без COUNT(*) и OFFSET.
+
+    Стоимость запроса любой страницы одинакова: выборка начинается
+    с позиции из токена ?after= или ?before= и читает per_page + 1 строк.
+    """
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = per_page
+
+    def get_page(self, after=None, before=None):
+        before_key = decode_cursor(before)
+        if before_key is not None:
+            return self._page_before(before_key)
+        return self._page_after(decode_cursor(after))
+
+    def seek_after(self, key):
+        queryset = self.queryset.order_by('-pub_date', '-pk')
+        if key is None:
+            return queryset
+        pub_date, pk = key
+        # Диапазон по pub_date отдельно от OR, иначе SQLite не идёт по индексу
+        return queryset.filter(
+            Q(pub_date__lt=pub_date) | Q(pk__lt=pk),
+            pub_date__lte=pub_date,
+        )
+
+    def seek_before(self, key):
+        pub_date, pk = key
+        return self.queryset.order_by('pub_date', 'pk').filter(
+            Q(pub_date__gt=pub_date) | Q(pk__gt=pk),
+            pub_date__gte=pub_date,
+        )
+
+    def _page_after(self, key):
+        rows = list(self.seek_after(key)[:self.per_page + 1])
+        return CursorPage(
+            rows[:self.per_page],
+            self,
+            has_next=len(rows) > self.per_page,
+            has_previous=key is not None,
+        )
+
+    def _page_before(self, key):
+        rows = list(self.seek_before(key)[:self.per_page + 1])
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        rows.reverse()
+        return CursorPage(
+            rows,
+            self,
+            has_next=bool(rows),
+            has_previous=has_previous,
+        )
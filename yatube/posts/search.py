@@ -0,0 +1,146 @@
+import re
+
+from django.db import NotSupportedError, connections, router
+
+from .models import Post
+
+FTS_TABLE = 'posts_post_fts'
+WORD_RE = re.compile(r'\w+')
+# PostgreSQL: конфигурация разбора текста; с ней же построен GIN-индекс
+# posts_post_text_search (миграция 0019), иначе индекс не используется
+SEARCH_CONFIG = 'russian'
+TSVECTOR = f"to_tsvector('{SEARCH_CONFIG}', text)"
+
+
+def get_connection(write=False):
+    if write:
+        return connections[router.db_for_write(Post)]
+    return connections[router.db_for_read(Post)]
+
+
+def fts_enabled(connection):
+    return connection.vendor == 'sqlite'
+
+
+def tsquery_enabled(connection):
+    return connection.vendor == 'postgresql'
+
+
+def build_match(query):
+    """Превращает ввод пользователя в безопасное выражение MATCH для FTS5.
+
+    Каждое слово ищется по префиксу, все слова должны встретиться в посте.
+    """
+    return ' '.join(f'"{word}"*' for word in WORD_RE.findall(query))
+
+
+def build_tsquery(query):
+    """То же для to_tsquery в PostgreSQL: слова по префиксу, через И.
+
+    Слова — только буквы и цифры, служебных символов tsquery в них нет.
+    """
+    return ' & '.join(f'{word}:*' for word in WORD_RE.findall(query))
+
+
+def get_search_sql(connection):
+    """Запросы числа найденных и страницы id для полнотекстового индекса.
+
+    Поиск подстрокой (LIKE по всей таблице) не подставляется молча:
+    без индекса поиск не работает.
+    """
+    if fts_enabled(connection):
+        where = f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s'
+        return (
+            f'SELECT count(*) {where}',
+            f'SELECT rowid {where} ORDER BY rank LIMIT %s OFFSET %s',
+        )
+    if tsquery_enabled(connection):
+        where = (
+            f"FROM {Post._meta.db_table}, "
+            f"to_tsquery('{SEARCH_CONFIG}', %s) AS query "
+            f"WHERE {TSVECTOR} @@ query"
+        )
+        return (
+            f'SELECT count(*) {where}',
+            f'SELECT id {where} '
+            f'ORDER BY ts_rank({TSVECTOR}, query) DESC, id DESC '
+            f'LIMIT %s OFFSET %s',
+        )
+    raise NotSupportedError(
+        f'Полнотекстовый поиск не поддержан для {connection.vendor}'
+    )
+
+
+def index_post(post):
+    connection = get_connection(write=True)
+    if not fts_enabled(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+            [post.pk, post.text],
+        )
+
+
+def unindex_post(post_id):
+    connection = get_connection(write=True)
+    if not fts_enabled(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id])
+
+
+def rebuild_search_index():
+    connection = get_connection(write=True)
+    if not fts_enabled(connection):
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, text) '
+            f'SELECT id, text FROM {Post._meta.db_table}'
+        )
+        cursor.execute(f'SELECT count(*) FROM {FTS_TABLE}')
+        return cursor.fetchone()[0]
+
+
+class SearchResults:
+    """Найденные посты, упорядоченные по релевантности.
+
+    Поддерживает count() и срезы, поэтому его можно отдать Paginator:
+    из индекса читаются только id нужной страницы.
+    """
+
+    def __init__(self, query):
+        self.query = query
+
+    def get_match(self, connection):
+        if tsquery_enabled(connection):
+            return build_tsquery(self.query)
+        return build_match(self.query)
+
+    def count(self):
+        connection = get_connection()
+        match = self.get_match(connection)
+        if not match:
+            return 0
+        count_sql, _ = get_search_sql(connection)
+        with connection.cursor() as cursor:
+            cursor.execute(count_sql, [match])
+            return cursor.fetchone()[0]
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        connection = get_connection()
+        match = self.get_match(connection)
+        if not match:
+            return []
+        _, page_sql = get_search_sql(connection)
+        start = index.start or 0
+        with connection.cursor() as cursor:
+            cursor.execute(page_sql, [match, index.stop - start, start])
+            ids = [row[0] for row in cursor.fetchall()]
+        posts = Post.objects.for_feed().in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
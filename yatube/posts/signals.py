@@ -0,0 +1,144 @@
+from django.db.models.signals import (post_delete, post_init, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+
+from .cache import bump_feed_version
+from .counters import (change_author_count, change_followers_count,
+                       change_group_count)
+from .feed import store_feed_entry, trim_feed
+from .markers import (author_feed, author_posts_feeds, group_posts_feeds,
+                      post_feeds, touch_feeds)
+from .models import Follow, Group, Post, User
+from .search import index_post, unindex_post
+from .timeline import backfill_timeline, drop_from_timeline, fan_out_post
+
+COUNTED_FIELDS = ('author_id', 'group_id')
+# Поля автора, которые видны в лентах
+SHOWN_USER_FIELDS = ('username', 'first_name', 'last_name')
+
+
+def remember_counted_fields(post):
+    post._counted = {
+        field: post.__dict__[field]
+        for field in COUNTED_FIELDS
+        if field in post.__dict__
+    }
+
+
+def get_counted_fields(post):
+    counted = getattr(post, '_counted', {})
+    if len(counted) < len(COUNTED_FIELDS):
+        # Поле было отложено через only()/defer(): берём значение из БД
+        counted = Post.objects.filter(pk=post.pk).values(
+            *COUNTED_FIELDS
+        ).first() or counted
+    return counted
+
+
+@receiver(post_init, sender=Post)
+def post_initialized(sender, instance, **kwargs):
+    remember_counted_fields(instance)
+
+
+@receiver(pre_save, sender=Post)
+@receiver(pre_delete, sender=Post)
+def post_changing(sender, instance, raw=False, **kwargs):
+    if not raw and not instance._state.adding:
+        instance._counted = get_counted_fields(instance)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    feeds = post_feeds(instance.author_id, instance.group_id)
+    if created:
+        change_author_count(instance.author_id, 1)
+        change_group_count(instance.group_id, 1)
+        fan_out_post(instance)
+        trim_feed()
+    else:
+        counted = instance._counted
+        old_author_id = counted.get('author_id', instance.author_id)
+        old_group_id = counted.get('group_id', instance.group_id)
+        if old_author_id != instance.author_id:
+            change_author_count(old_author_id, -1)
+            change_author_count(instance.author_id, 1)
+        if old_group_id != instance.group_id:
+            change_group_count(old_group_id, -1)
+            change_group_count(instance.group_id, 1)
+        feeds += post_feeds(old_author_id, old_group_id)
+    store_feed_entry(instance)
+    touch_feeds(feeds, instance.updated_at)
+    remember_counted_fields(instance)
+    index_post(instance)
+    bump_feed_version()
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counted = instance._counted
+    change_author_count(counted['author_id'], -1)
+    change_group_count(counted['group_id'], -1)
+    touch_feeds(post_feeds(counted['author_id'], counted['group_id']))
+    unindex_post(instance.pk)
+    bump_feed_version()
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    if raw or not created:
+        return
+    change_followers_count(instance.author_id, 1)
+    backfill_timeline(instance.user_id, instance.author_id)
+    # Кнопка подписки на странице автора: сбрасываем ответы 304
+    touch_feeds([author_feed(instance.author_id)])
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    change_followers_count(instance.author_id, -1)
+    drop_from_timeline(instance.user_id, instance.author_id)
+    touch_feeds([author_feed(instance.author_id)])
+
+
+def get_shown_fields(user):
+    return {field: user.__dict__.get(field) for field in SHOWN_USER_FIELDS}
+
+
+@receiver(post_init, sender=User)
+def user_initialized(sender, instance, **kwargs):
+    instance._shown = get_shown_fields(instance)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw=False, **kwargs):
+    # Вход пользователя тоже сохраняет его (last_login): ленты сбрасываем,
+    # только если изменилось видимое в них имя
+    shown = get_shown_fields(instance)
+    if raw or created or shown == instance._shown:
+        return
+    instance._shown = shown
+    touch_feeds(author_posts_feeds(instance.pk))
+    bump_feed_version()
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, raw=False, **kwargs):
+    if raw or created:
+        return
+    touch_feeds(group_posts_feeds(instance.pk))
+    bump_feed_version()
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    # После удаления посты уже отвязаны от группы (SET_NULL одним UPDATE,
+    # без сигналов Post): ленты собираем заранее
+    instance._posts_feeds = group_posts_feeds(instance.pk)
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    touch_feeds(instance._posts_feeds)
+    bump_feed_version()
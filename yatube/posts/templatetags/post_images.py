@@ -0,0 +1,29 @@
+from django import template
+
+from posts.thumbnails import THUMBNAILS, find_post_thumbnails
+
+register = template.Library()
+
+
+@register.inclusion_tag('posts/includes/post_image.html')
+def post_image(post, kind):
+    """Картинка поста с ленивой загрузкой и srcset из готовых миниатюр.
+
+    Пока воркер не сделал миниатюры или их нет в key-value хранилище,
+    показывается исходный файл: в запросе картинки не пережимаются.
+    """
+    if not post.image:
+        return {}
+    thumbnails = post.thumbnails_ready and find_post_thumbnails(post, kind)
+    if not thumbnails:
+        return {'src': post.image.url}
+    return {
+        'src': thumbnails[0].url,
+        'width': thumbnails[0].width,
+        'height': thumbnails[0].height,
+        'srcset': ', '.join(
+            f'{thumbnail.url} {thumbnail.width}w'
+            for thumbnail in thumbnails
+        ),
+        'sizes': THUMBNAILS[kind]['sizes'],
+    }
@@ -1,15 +1,28 @@
 import shutil
 import tempfile
+from io import BytesIO, StringIO
 
 from django.conf import settings
-from django.test import Client, TestCase, override_settings
+from django.core.files.uploadedfile import (SimpleUploadedFile,
+                                            TemporaryUploadedFile)
+from django.core.management import call_command
+from django.test import Client, RequestFactory, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
 from ..models import Group, Post, User
+from ..thumbnails import (find_post_thumbnails, make_thumbnails,
+                          process_pending_thumbnails)
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
+def make_image(name='picture.png', size=(1200, 800)):
+    content = BytesIO()
+    Image.new('RGB', size, 'teal').save(content, 'PNG')
+    return SimpleUploadedFile(name, content.getvalue(), 'image/png')
+
+
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class PostFormTest(TestCase):
 
@@ -109,3 +122,114 @@ class PostFormTest(TestCase):
         self.assertRedirects(response, f'{login_url}?next={edit_url}')
         self.assertEqual(Post.objects.count(), posts_count)
         self.assertNotEqual(self.post.text, form_data['text'])
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class PostImageTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='painter')
+        self.client.force_login(self.user)
+
+    def create_post(self, image):
+        return self.client.post(
+            reverse('posts:post_create'),
+            {'text': 'Пост с картинкой', 'image': image},
+        )
+
+    def test_upload_is_streamed_to_temporary_file(self):
+        request = RequestFactory().post(
+            reverse('posts:post_create'), {'image': make_image()}
+        )
+        self.assertIsInstance(request.FILES['image'], TemporaryUploadedFile)
+
+    @override_settings(POSTS_IMAGE_MAX_SIZE=100)
+    def test_too_large_image_is_rejected(self):
+        response = self.create_post(make_image())
+        self.assertFormError(
+            response, 'form', 'image', 'Картинка больше 100\xa0байт'
+        )
+        self.assertFalse(Post.objects.exists())
+
+    def test_thumbnails_are_made_by_worker_not_request(self):
+        self.create_post(make_image())
+        post = Post.objects.get()
+        self.assertTrue(post.image.name.startswith('posts/'))
+        self.assertEqual(post.thumbnail_status, Post.THUMBNAILS_PENDING)
+        detail_url = reverse('posts:post_detail', args=[post.pk])
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, f'src="{post.image.url}"')
+        self.assertContains(response, 'loading="lazy"')
+        self.assertNotContains(response, 'srcset')
+
+        out = StringIO()
+        call_command('process_thumbnails', once=True, stdout=out)
+        self.assertIn('Обработано картинок: 1', out.getvalue())
+        post.refresh_from_db()
+        self.assertEqual(post.thumbnail_status, Post.THUMBNAILS_READY)
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotContains(response, f'src="{post.image.url}"')
+        self.assertContains(response, '480w, ')
+        self.assertContains(response, ' 960w"')
+        self.assertContains(response, 'width="480" height="270"')
+        response = self.client.get(detail_url)
+        self.assertContains(response, ' 960w, ')
+        # Исходник меньше 1920 пикселей: без растягивания
+        self.assertContains(response, ' 1200w"')
+        self.assertEqual(process_pending_thumbnails(), 0)
+
+    def test_new_image_needs_new_thumbnails(self):
+        self.create_post(make_image())
+        process_pending_thumbnails()
+        post = Post.objects.get()
+        self.client.post(
+            reverse('posts:post_edit', args=[post.pk]),
+            {'text': 'Другая картинка', 'image': make_image('other.png')},
+        )
+        post.refresh_from_db()
+        self.assertIn('other', post.image.name)
+        self.assertEqual(post.thumbnail_status, Post.THUMBNAILS_PENDING)
+
+    def test_image_replaced_during_processing_stays_pending(self):
+        self.create_post(make_image())
+        stale = Post.objects.get()
+        post = Post.objects.get()
+        post.image = make_image('other.png')
+        post.save()
+        self.assertFalse(make_thumbnails(stale))
+        post.refresh_from_db()
+        self.assertEqual(post.thumbnail_status, Post.THUMBNAILS_PENDING)
+        self.assertEqual(process_pending_thumbnails(), 1)
+        post.refresh_from_db()
+        self.assertEqual(post.thumbnail_status, Post.THUMBNAILS_READY)
+
+    def test_request_does_not_make_missing_thumbnails(self):
+        self.create_post(make_image())
+        Post.objects.update(thumbnail_status=Post.THUMBNAILS_READY)
+        post = Post.objects.get()
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, f'src="{post.image.url}"')
+        self.assertNotContains(response, 'srcset')
+        self.assertIsNone(find_post_thumbnails(post, 'feed'))
+
+    def test_broken_image_is_marked_failed(self):
+        post = Post.objects.create(
+            text='Битая картинка',
+            author=self.user,
+            image=SimpleUploadedFile('broken.png', b'not an image'),
+        )
+        # Ошибку логируют и sorl, и воркер
+        with self.assertLogs(level='ERROR') as logs:
+            self.assertEqual(process_pending_thumbnails(), 1)
+        self.assertIn(
+            f'Не удалось сделать миниатюры поста {post.pk}',
+            '\n'.join(logs.output),
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.thumbnail_status, Post.THUMBNAILS_FAILED)
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, f'src="{post.image.url}"')
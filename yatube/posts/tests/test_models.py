@@ -1,7 +1,14 @@
+from io import StringIO
+from unittest import mock
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.management import call_command
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
 
-from posts.models import Group, Post
+from posts.counters import change_author_count, get_author_posts_count
+from posts.excerpts import rebuild_excerpts
+from posts.models import RENDER_VERSION, AuthorCounter, Group, Post
 
 User = get_user_model()
 
@@ -30,3 +37,152 @@ class PostModelTest(TestCase):
         post = PostModelTest.post
         expected_object_name = post.text[:15]
         self.assertEqual(expected_object_name, str(post))
+
+
+class PostCounterTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='counter')
+        self.group = Group.objects.create(
+            title='Group 1', slug='group-1', description='-'
+        )
+        self.other_group = Group.objects.create(
+            title='Group 2', slug='group-2', description='-'
+        )
+        self.post = Post.objects.create(
+            author=self.user, text='Counted post', group=self.group
+        )
+
+    def assertCounts(self, author_count, group_count, other_group_count):
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        self.assertEqual(get_author_posts_count(self.user), author_count)
+        self.assertEqual(self.group.posts_count, group_count)
+        self.assertEqual(self.other_group.posts_count, other_group_count)
+
+    def test_create_increments_counters(self):
+        Post.objects.create(author=self.user, text='Second', group=self.group)
+        Post.objects.create(author=self.user, text='No group')
+        self.assertCounts(3, 2, 0)
+
+    def test_group_change_moves_counter(self):
+        post = Post.objects.only('pk', 'text').get(pk=self.post.pk)
+        post.group = self.other_group
+        post.save()
+        self.assertCounts(1, 0, 1)
+        post.group = None
+        post.save()
+        self.assertCounts(1, 0, 0)
+
+    def test_delete_decrements_counters(self):
+        self.post.delete()
+        self.assertCounts(0, 0, 0)
+
+    def test_delete_author_with_several_posts(self):
+        Post.objects.create(author=self.user, text='Second', group=self.group)
+        Post.objects.create(author=self.user, text='Third')
+        self.user.delete()
+        self.assertFalse(Post.objects.exists())
+        self.assertFalse(AuthorCounter.objects.exists())
+        self.assertCounts(0, 0, 0)
+
+    def test_delete_imported_post_without_counters(self):
+        Post.objects.bulk_create([
+            Post(author=self.user, text='Bulk', group=self.other_group),
+        ])
+        AuthorCounter.objects.all().delete()
+        Post.objects.filter(text='Bulk').get().delete()
+        self.post.delete()
+        self.assertCounts(0, 0, 0)
+
+    def test_concurrent_first_posts_share_counter(self):
+        author = User.objects.create_user(username='racer')
+        bulk_create = QuerySet.bulk_create
+
+        def racing_bulk_create(queryset, objs, **kwargs):
+            if queryset.model is AuthorCounter:
+                # Другой запрос успел вставить строку и посчитать свой пост
+                AuthorCounter.objects.create(author=author, posts_count=1)
+            return bulk_create(queryset, objs, **kwargs)
+
+        with mock.patch.object(QuerySet, 'bulk_create', racing_bulk_create):
+            change_author_count(author.pk, 1)
+        self.assertEqual(get_author_posts_count(author), 2)
+
+    def test_rebuild_command_restores_counters(self):
+        Post.objects.bulk_create([
+            Post(author=self.user, text='Bulk', group=self.other_group),
+        ] * 3)
+        AuthorCounter.objects.all().delete()
+        call_command('rebuild_post_counters', stdout=StringIO())
+        self.assertCounts(4, 1, 3)
+
+
+@override_settings(POSTS_EXCERPT_LENGTH=20)
+class PostExcerptTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='excerpt')
+        self.post = Post.objects.create(author=self.user, text='Коротко')
+
+    def test_excerpt_is_saved_with_post(self):
+        self.assertEqual(self.post.excerpt, 'Коротко')
+        self.assertFalse(self.post.excerpt_truncated)
+        self.post.text = 'Очень длинный текст поста ' * 10
+        self.post.save(update_fields=['text'])
+        self.post.refresh_from_db()
+        self.assertEqual(len(self.post.excerpt), 20)
+        self.assertTrue(self.post.excerpt.endswith('…'))
+        self.assertTrue(self.post.excerpt_truncated)
+
+    def test_rebuild_command_fills_missing_excerpts(self):
+        Post.objects.bulk_create([
+            Post(author=self.user, text='Пост без начала ' * 5),
+        ] * 3)
+        out = StringIO()
+        call_command('rebuild_excerpts', stdout=out)
+        self.assertIn('3', out.getvalue())
+        self.assertFalse(Post.objects.filter(excerpt='').exists())
+        self.assertEqual(rebuild_excerpts(), 0)
+
+
+class PostRenderTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='render')
+        self.post = Post.objects.create(
+            author=self.user,
+            text='<script>alert(1)</script>\nВторая строка ' + 'слово ' * 40,
+        )
+
+    def test_html_is_rendered_on_save(self):
+        self.assertEqual(self.post.html_version, RENDER_VERSION)
+        self.assertTrue(self.post.text_html.startswith(
+            '&lt;script&gt;alert(1)&lt;/script&gt;<br>Вторая строка'
+        ))
+        self.assertNotIn('<script>', self.post.heading_html)
+        self.assertTrue(self.post.heading_html.endswith('…'))
+        self.assertEqual(self.post.body_html, self.post.text_html)
+
+    def test_stale_html_is_rendered_on_the_fly_until_rebuild(self):
+        Post.objects.filter(pk=self.post.pk).update(
+            text_html='старый HTML', html_version=0
+        )
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertNotEqual(post.body_html, 'старый HTML')
+        self.assertEqual(post.body_html, self.post.text_html)
+        self.assertEqual(rebuild_excerpts(), 1)
+        post.refresh_from_db()
+        self.assertEqual(post.html_version, RENDER_VERSION)
+        self.assertEqual(post.text_html, self.post.text_html)
+
+    def test_fragment_key_follows_author_and_group_renames(self):
+        group = Group.objects.create(title='Группа', slug='old-slug')
+        self.post.group = group
+        self.post.save()
+        key = Post.objects.for_feed().get().fragment_key
+        self.user.first_name = 'Новое'
+        self.user.save()
+        renamed = Post.objects.for_feed().get().fragment_key
+        self.assertNotEqual(renamed, key)
+        group.slug = 'new-slug'
+        group.save()
+        moved = Post.objects.for_feed().get().fragment_key
+        self.assertNotEqual(moved, renamed)
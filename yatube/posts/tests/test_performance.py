@@ -0,0 +1,354 @@
+import json
+import os
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.testing import report
+
+from ..counters import get_author_posts_count
+from ..feed import MaterializedFeed, rebuild_feed_table
+from ..generator import DataGenerator
+from ..models import Follow, Group, Post, User
+from ..paginators import CursorPaginator
+from ..search import (FTS_TABLE, SearchResults, build_match, build_tsquery,
+                      get_search_sql, rebuild_search_index)
+from ..timeline import FollowTimeline, rebuild_timelines
+
+# Полный прогон: POSTS_BENCHMARK_SIZE=1000000 python manage.py test posts
+BENCHMARK_SIZE = int(os.getenv('POSTS_BENCHMARK_SIZE', 10_000))
+BENCHMARK_AUTHORS = 100
+BENCHMARK_GROUPS = 20
+ADMIN_BENCHMARK_SIZE = int(os.getenv('ADMIN_BENCHMARK_SIZE', 100_000))
+# Полный прогон импорта: IMPORT_BENCHMARK_SIZE=1000000
+IMPORT_BENCHMARK_SIZE = int(os.getenv('IMPORT_BENCHMARK_SIZE', 20_000))
+BATCH_SIZE = 5_000
+POSTS_PAGE = 10
+
+
+def seed_posts(size, authors, groups):
+    batch = []
+    for i in range(size):
+        batch.append(Post(
+            text=f'Benchmark post {i}',
+            author=authors[i % len(authors)],
+            group=groups[i % len(groups)] if i % 3 else None,
+        ))
+        if len(batch) == BATCH_SIZE:
+            Post.objects.bulk_create(batch)
+            batch = []
+    Post.objects.bulk_create(batch)
+    # auto_now_add ставит почти одинаковое время: разносим даты по секундам
+    Post.objects.update(pub_date=timezone.now() - timedelta(seconds=size))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "UPDATE posts_post SET pub_date = "
+            "datetime(pub_date, '+' || id || ' seconds')"
+        )
+        cursor.execute('ANALYZE')
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN из SQLite')
+class FeedIndexBenchmarkTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.authors = [
+            User(username=f'bench_{i}') for i in range(BENCHMARK_AUTHORS)
+        ]
+        User.objects.bulk_create(cls.authors)
+        cls.authors = list(User.objects.filter(username__startswith='bench_'))
+        Group.objects.bulk_create(
+            Group(title=f'Bench {i}', slug=f'bench-{i}', description='-')
+            for i in range(BENCHMARK_GROUPS)
+        )
+        cls.groups = list(Group.objects.filter(slug__startswith='bench-'))
+        started = time.perf_counter()
+        seed_posts(BENCHMARK_SIZE, cls.authors, cls.groups)
+        rebuild_search_index()
+        cls.seed_time = time.perf_counter() - started
+
+    def get_feeds(self):
+        return {
+            'index': Post.objects.for_feed(),
+            'group': self.groups[0].posts.for_feed(),
+            'profile': self.authors[0].posts.for_feed(),
+        }
+
+    def test_feeds_use_indexes_without_temp_sort(self):
+        expected_indexes = {
+            'index': 'post_pub_date_idx',
+            'group': 'post_group_pub_date_idx',
+            'profile': 'post_author_pub_date_idx',
+        }
+        for feed, queryset in self.get_feeds().items():
+            with self.subTest(feed=feed):
+                plan = queryset[:POSTS_PAGE].explain()
+                self.assertIn(expected_indexes[feed], plan)
+                self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_deep_cursor_page_costs_as_much_as_first(self):
+        for feed, queryset in self.get_feeds().items():
+            with self.subTest(feed=feed):
+                oldest = queryset.order_by('pub_date', 'pk')[POSTS_PAGE]
+                paginator = CursorPaginator(queryset, POSTS_PAGE)
+                deep_page = paginator.seek_after(
+                    (oldest.pub_date, oldest.pk)
+                )[:POSTS_PAGE]
+                plan = deep_page.explain()
+                self.assertNotIn('TEMP B-TREE', plan)
+                timings = []
+                for page in (queryset[:POSTS_PAGE], deep_page):
+                    started = time.perf_counter()
+                    self.assertEqual(len(list(page)), POSTS_PAGE)
+                    timings.append(time.perf_counter() - started)
+                report(
+                    f'{feed}: {BENCHMARK_SIZE} posts seeded in '
+                    f'{self.seed_time:.1f}s, first page {timings[0]:.4f}s, '
+                    f'last page {timings[1]:.4f}s'
+                )
+
+    def test_follow_timeline_is_one_index_range_scan(self):
+        reader = self.authors[0]
+        Follow.objects.bulk_create(
+            Follow(user=reader, author=author) for author in self.authors[1:]
+        )
+        rebuild_timelines()
+        timeline = FollowTimeline(reader)
+        self.assertEqual(timeline.pull_author_ids, [])
+        plan = timeline.entries()[:POSTS_PAGE].explain()
+        self.assertIn('timeline_user_pub_date_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+        self.assertEqual(len(timeline[:POSTS_PAGE]), POSTS_PAGE)
+
+    def test_feed_table_is_one_index_range_scan(self):
+        rebuild_feed_table()
+        expected_indexes = {
+            'index': 'feed_pub_date_idx',
+            'group': 'feed_group_pub_date_idx',
+        }
+        for feed, materialized in {
+            'index': MaterializedFeed(),
+            'group': MaterializedFeed(self.groups[0].pk),
+        }.items():
+            with self.subTest(feed=feed):
+                plan = materialized.entries()[:POSTS_PAGE].explain()
+                self.assertIn(expected_indexes[feed], plan)
+                self.assertNotIn('TEMP B-TREE', plan)
+                self.assertEqual(
+                    materialized[:POSTS_PAGE],
+                    list(self.get_feeds()[feed][:POSTS_PAGE]),
+                )
+
+    def test_search_uses_full_text_index_instead_of_like_scan(self):
+        term = str(BENCHMARK_SIZE // 2)
+        like = Post.objects.filter(text__icontains=term).values('pk')
+        self.assertIn('SCAN posts_post', like.explain())
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'EXPLAIN QUERY PLAN SELECT rowid FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s ORDER BY rank',
+                [build_match(term)],
+            )
+            fts_plan = ' '.join(row[-1] for row in cursor.fetchall())
+        self.assertIn('VIRTUAL TABLE INDEX', fts_plan)
+        timings = []
+        for search in (
+            lambda: list(like),
+            lambda: SearchResults(term)[:POSTS_PAGE],
+        ):
+            started = time.perf_counter()
+            self.assertTrue(search())
+            timings.append(time.perf_counter() - started)
+        report(
+            f'search over {BENCHMARK_SIZE} posts: LIKE {timings[0]:.4f}s, '
+            f'FTS5 {timings[1]:.4f}s'
+        )
+
+
+@skipUnless(connection.vendor == 'postgresql', 'GIN-индекс PostgreSQL')
+class PostgresSearchIndexTest(TestCase):
+    def test_search_uses_gin_index(self):
+        _, page_sql = get_search_sql(connection)
+        with connection.cursor() as cursor:
+            # На пустой таблице планировщик иначе выберет полный просмотр
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute(
+                f'EXPLAIN {page_sql}', [build_tsquery('кошки'), POSTS_PAGE, 0]
+            )
+            plan = ' '.join(row[0] for row in cursor.fetchall())
+        self.assertIn('posts_post_text_search', plan)
+
+
+class DatabaseLoadTest(TransactionTestCase):
+    def test_db_loadtest_runs_concurrent_writers_and_readers(self):
+        out = StringIO()
+        call_command(
+            'db_loadtest', writers=2, readers=2, operations=20, stdout=out
+        )
+        # Тестовая БД SQLite в памяти не держит параллельную запись,
+        # поэтому здесь проверяется только отчёт, а не отсутствие ошибок
+        self.assertRegex(out.getvalue(), r'\d+ writes/s, \d+ reads/s')
+        self.assertFalse(Post.objects.exists())
+
+
+class DataGeneratorTest(TestCase):
+    def generate(self, seed):
+        return list(DataGenerator(seed).iter_rows(
+            500, [f'author_{i}' for i in range(50)], ['first', 'second'],
+        ))
+
+    def test_rows_are_reproducible_and_skewed(self):
+        rows = self.generate(seed=1)
+        self.assertEqual(
+            [row['text'] for row in rows],
+            [row['text'] for row in self.generate(seed=1)],
+        )
+        self.assertNotEqual(rows, self.generate(seed=2))
+        authors = [row['author'] for row in rows]
+        # Самый активный автор пишет много больше среднего
+        self.assertGreater(authors.count('author_0'), 5 * len(rows) / 50)
+        groups = [row['group'] for row in rows]
+        self.assertGreater(groups.count('first'), groups.count('second'))
+        self.assertIn(None, groups)
+
+    def test_generate_data_command(self):
+        out = StringIO()
+        call_command(
+            'generate_data', users=5, groups=2, posts=30, batch_size=10,
+            stdout=out,
+        )
+        self.assertIn('Сгенерировано 30 постов', out.getvalue())
+        self.assertEqual(Post.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 2)
+        self.assertEqual(
+            sum(get_author_posts_count(user) for user in User.objects.all()),
+            30,
+        )
+
+
+class LoadTestHarnessTest(TransactionTestCase):
+    def test_loadtest_reports_latency_and_queries(self):
+        call_command(
+            'generate_data', users=5, groups=2, posts=30, stdout=StringIO()
+        )
+        out = StringIO()
+        call_command('loadtest', threads=1, requests=30, stdout=out)
+        report = out.getvalue()
+        self.assertRegex(
+            report,
+            r'index: \d+ requests, p50 [\d.]+ms, p95 [\d.]+ms, '
+            r'p99 [\d.]+ms, [\d.]+ queries/request, 0 errors',
+        )
+        self.assertIn('30 requests in', report)
+
+    def test_loadtest_needs_data(self):
+        with self.assertRaises(CommandError):
+            call_command('loadtest', threads=1, requests=1)
+
+
+class AdminChangelistBenchmarkTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='admin'
+        )
+        User.objects.bulk_create(
+            User(username=f'admin_author_{i}') for i in range(10)
+        )
+        Group.objects.bulk_create(
+            Group(title=f'Admin {i}', slug=f'admin-{i}', description='-')
+            for i in range(BENCHMARK_GROUPS)
+        )
+        seed_posts(
+            ADMIN_BENCHMARK_SIZE,
+            list(User.objects.all()),
+            list(Group.objects.all()),
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_changelist_query_budget(self):
+        # Сессия, пользователь, оценка числа строк, группы, страница постов
+        budget = 5
+        url = reverse('admin:posts_post_changelist')
+        for page in (0, ADMIN_BENCHMARK_SIZE // 100 // 2):
+            with self.subTest(page=page):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url, {'p': page})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(queries), budget)
+                for query in queries.captured_queries:
+                    self.assertNotIn('COUNT(*)', query['sql'])
+
+
+class ImportBenchmarkTest(TestCase):
+    def setUp(self):
+        self.source = tempfile.NamedTemporaryFile(
+            'w', suffix='.ndjson', encoding='utf-8', delete=False
+        )
+        with self.source:
+            for i in range(IMPORT_BENCHMARK_SIZE):
+                self.source.write(json.dumps({
+                    'text': f'Imported post {i}',
+                    'author': f'import_author_{i % BENCHMARK_AUTHORS}',
+                    'group': f'import-{i % BENCHMARK_GROUPS}' if i % 3
+                    else None,
+                    'pub_date': f'2020-01-01T00:00:{i % 60:02}+00:00',
+                }) + '\n')
+
+    def tearDown(self):
+        os.remove(self.source.name)
+
+    def test_import_throughput(self):
+        out = StringIO()
+        started = time.perf_counter()
+        call_command('import_posts', self.source.name, stdout=out)
+        elapsed = time.perf_counter() - started
+        self.assertEqual(Post.objects.count(), IMPORT_BENCHMARK_SIZE)
+        self.assertEqual(
+            User.objects.filter(username__startswith='import_').count(),
+            BENCHMARK_AUTHORS,
+        )
+        report(
+            f'import of {IMPORT_BENCHMARK_SIZE} posts: {elapsed:.1f}s, '
+            f'{IMPORT_BENCHMARK_SIZE / elapsed:.0f} rows/s'
+        )
+
+
+class FeedExcerptBenchmarkTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='excerpt_bench')
+        for i in range(POSTS_PAGE):
+            Post.objects.create(
+                text=f'Длинный пост {i}. ' + 'Текст поста. ' * 400,
+                author=author,
+            )
+
+    def test_excerpts_cut_bytes_read_and_sent(self):
+        full = sum(
+            len(text.encode()) for text in Post.objects.values_list(
+                'text', flat=True
+            )
+        )
+        read = sum(
+            len(post.excerpt.encode())
+            for post in Post.objects.for_feed()[:POSTS_PAGE]
+        )
+        response = self.client.get(reverse('posts:index'))
+        self.assertLess(read * 10, full)
+        self.assertLess(len(response.content), full)
+        report(
+            f'feed page of {POSTS_PAGE} long posts: text {full} bytes, '
+            f'excerpts {read} bytes, response {len(response.content)} bytes'
+        )
@@ -1,13 +1,36 @@
+import csv
+import json
+import os
 import shutil
 import tempfile
+from datetime import timedelta
+from http import HTTPStatus
+from io import StringIO
+from unittest import mock
 
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.core.paginator import Paginator
+from django.db import NotSupportedError, connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from ..models import Group, Post
+from core.templatetags.pagination import page_window
+from core.testing import QueryBudgetMixin
+
+from ..cache import bump_feed_version, get_feed_version
+from ..counters import get_author_posts_count
+from ..feed import MaterializedFeed, rebuild_feed_table, trim_feed
+from ..search import build_tsquery, get_search_sql
+from ..timeline import FollowTimeline, get_followers_count
+from ..markers import (INDEX_FEED, author_feed, get_feed_changed_at,
+                       group_feed)
+from ..models import (AuthorCounter, FeedEntry, Follow, Group, Post,
+                      TimelineEntry)
 
 User = get_user_model()
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -99,6 +122,14 @@ class PostPagesTests(TestCase):
         self.assertEqual(post, Post.objects.get(id=self.post.id))
         self.assertEqual(post_count, 1)
 
+    def test_post_detail_without_group(self):
+        post = Post.objects.create(text='Без группы', author=self.user)
+        response = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.id})
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotContains(response, 'все записи группы')
+
     def test_create_post_show_correct_context(self):
         response = self.authorized_client.get(reverse('posts:post_create'))
         form_fields = {
@@ -190,6 +221,8 @@ class PaginatorViewsTest(TestCase):
                 ),
             ] * TESTING_ATTEMPTS
         )
+        # bulk_create обходит сигналы
+        rebuild_feed_table()
 
     def test_first_page_contains_ten_records(self):
         templates_pages_names = {
@@ -220,3 +253,862 @@ class PaginatorViewsTest(TestCase):
             with self.subTest(reverse_template=reverse_template):
                 response = self.client.get(reverse_template + '?page=2')
                 self.assertEqual(len(response.context['page_obj']), expected)
+
+
+@override_settings(POSTS_CURSOR_PAGINATION=True)
+class CursorPaginatorViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='TestUser3')
+        self.group = Group.objects.create(
+            title='Test group_3',
+            slug='test-slug_3',
+            description='Test description_3',
+        )
+        Post.objects.bulk_create(
+            Post(
+                text=f'Testing cursor {i}',
+                author=self.user,
+                group=self.group,
+            ) for i in range(TESTING_ATTEMPTS)
+        )
+        rebuild_feed_table()
+        self.urls = [
+            reverse('posts:index'),
+            reverse('posts:group_posts', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+        ]
+
+    def test_cursor_pages_walk_whole_feed(self):
+        expected = list(
+            Post.objects.order_by('-pub_date', '-pk').values_list(
+                'pk', flat=True
+            )
+        )
+        for url in self.urls:
+            with self.subTest(url=url):
+                first_page = self.client.get(url).context['page_obj']
+                self.assertTrue(first_page.is_cursor)
+                self.assertEqual(len(first_page), POSTS_PER_PAGE)
+                self.assertFalse(first_page.has_previous())
+                second_page = self.client.get(
+                    url, {'after': first_page.next_cursor}
+                ).context['page_obj']
+                self.assertEqual(
+                    len(second_page), TESTING_ATTEMPTS % POSTS_PER_PAGE
+                )
+                self.assertFalse(second_page.has_next())
+                self.assertEqual(
+                    [post.pk for post in first_page]
+                    + [post.pk for post in second_page],
+                    expected,
+                )
+
+    def test_before_cursor_returns_previous_page(self):
+        url = reverse('posts:index')
+        first_page = self.client.get(url).context['page_obj']
+        second_page = self.client.get(
+            url, {'after': first_page.next_cursor}
+        ).context['page_obj']
+        back_page = self.client.get(
+            url, {'before': second_page.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(back_page), list(first_page))
+        self.assertFalse(back_page.has_previous())
+
+    def test_broken_cursor_returns_first_page(self):
+        url = reverse('posts:index')
+        first_page = self.client.get(url).context['page_obj']
+        broken_page = self.client.get(
+            url, {'after': 'not-a-cursor'}
+        ).context['page_obj']
+        self.assertEqual(list(broken_page), list(first_page))
+
+    def test_page_number_falls_back_to_paginator(self):
+        response = self.client.get(reverse('posts:index'), {'page': 2})
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.number, 2)
+        self.assertEqual(len(page_obj), TESTING_ATTEMPTS % POSTS_PER_PAGE)
+
+
+class FeedQueriesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='TestUser4', first_name='Test', last_name='User'
+        )
+        self.group = Group.objects.create(
+            title='Test group_4',
+            slug='test-slug_4',
+            description='Test description_4',
+        )
+        for i in range(TESTING_ATTEMPTS * 2):
+            author = User.objects.create_user(username=f'author_{i}')
+            group = Group.objects.create(
+                title=f'Group {i}', slug=f'group-{i}', description='-'
+            )
+            Post.objects.create(text='Feed post', author=author, group=group)
+        for i in range(TESTING_ATTEMPTS * 2):
+            Post.objects.create(
+                text='Feed post', author=self.user, group=self.group
+            )
+
+    def test_feed_query_budget_does_not_depend_on_page_size(self):
+        # С холодным кэшем лента ещё считает посты старше горизонта
+        feed_budgets = {
+            reverse('posts:index'): 4,
+            reverse('posts:group_posts',
+                    kwargs={'slug': self.group.slug}): 6,
+            reverse('posts:profile',
+                    kwargs={'username': self.user.username}): 6,
+        }
+        for per_page in (1, POSTS_PER_PAGE, TESTING_ATTEMPTS * 2):
+            for url, budget in feed_budgets.items():
+                with self.subTest(url=url, per_page=per_page):
+                    cache.clear()
+                    with mock.patch('posts.views.POSTS_PER_PAGE', per_page):
+                        with self.assertNumQueries(budget):
+                            self.client.get(url)
+
+    def test_cached_feed_fragment_skips_post_queries(self):
+        cached_budgets = {
+            reverse('posts:index'): 1,
+            reverse('posts:group_posts',
+                    kwargs={'slug': self.group.slug}): 3,
+            reverse('posts:profile',
+                    kwargs={'username': self.user.username}): 4,
+        }
+        cache.clear()
+        for url, budget in cached_budgets.items():
+            with self.subTest(url=url):
+                self.client.get(url)
+                with self.assertNumQueries(budget):
+                    self.client.get(url)
+
+    def test_new_post_invalidates_cached_feed(self):
+        url = reverse('posts:index')
+        cache.clear()
+        self.client.get(url)
+        Post.objects.create(text='Fresh post', author=self.user)
+        self.assertContains(self.client.get(url), 'Fresh post')
+
+    def test_author_and_group_edits_invalidate_cached_feed(self):
+        url = reverse('posts:index')
+        cache.clear()
+        self.client.get(url)
+        self.user.first_name = 'Renamed'
+        self.user.save()
+        self.assertContains(self.client.get(url), 'Renamed User')
+        self.group.slug = 'renamed-group'
+        self.group.save()
+        self.assertContains(
+            self.client.get(url),
+            reverse('posts:group_posts', args=['renamed-group']),
+        )
+
+    def test_group_delete_invalidates_cached_feed(self):
+        url = reverse('posts:index')
+        group_url = reverse('posts:group_posts', args=[self.group.slug])
+        cache.clear()
+        self.assertContains(self.client.get(url), group_url)
+        self.group.delete()
+        self.assertNotContains(self.client.get(url), group_url)
+
+    def test_login_keeps_cached_feed(self):
+        version = get_feed_version()
+        self.client.force_login(self.user)
+        self.assertEqual(get_feed_version(), version)
+
+
+class QueryBudgetTest(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser(
+            username='budget', email='budget@example.com', password='-'
+        )
+        self.client.force_login(self.user)
+        self.group = Group.objects.create(
+            title='Budget', slug='budget', description='-'
+        )
+        self.post = Post.objects.create(
+            text='Budget post', author=self.user, group=self.group
+        )
+        self.star = User.objects.create_user(username='budget_star')
+
+    def add_posts(self, count):
+        for i in range(count):
+            author = User.objects.create_user(username=f'budget_{count}_{i}')
+            Follow.objects.create(user=self.user, author=author)
+            group = Group.objects.create(
+                title=f'Budget {i}', slug=f'budget-{count}-{i}',
+                description='-',
+            )
+            Post.objects.create(text='Другой пост', author=author, group=group)
+            Post.objects.create(
+                text='Budget post', author=self.user, group=self.group
+            )
+
+    def test_every_url_fits_query_budget_at_any_data_size(self):
+        post_id = self.post.id
+        # В каждом бюджете два запроса на сессию и пользователя
+        budgets = {
+            'index': (reverse('posts:index'), 6),
+            'group_posts': (
+                reverse('posts:group_posts', args=[self.group.slug]), 8
+            ),
+            'profile': (
+                reverse('posts:profile', args=[self.user.username]), 8
+            ),
+            'search': (reverse('posts:search') + '?q=Budget', 5),
+            'export': (reverse('posts:export'), 3),
+            'post_detail': (reverse('posts:post_detail', args=[post_id]), 6),
+            'post_create': (reverse('posts:post_create'), 3),
+            'post_edit': (reverse('posts:post_edit', args=[post_id]), 4),
+            'follow_index': (reverse('posts:follow_index'), 6),
+            # Запись подписки, вставка и обновление счётчика, перенос
+            # постов в ленту, маркер
+            'profile_follow': (
+                reverse('posts:profile_follow', args=[self.star.username]),
+                14
+            ),
+            'profile_unfollow': (
+                reverse('posts:profile_unfollow', args=[self.star.username]),
+                7
+            ),
+        }
+        for size in (0, TESTING_ATTEMPTS * 2):
+            with self.subTest(size=size):
+                self.add_posts(size)
+                self.assertUrlBudgets('posts.urls', budgets)
+
+
+class PageWindowTest(TestCase):
+    def test_small_paginator_shows_all_pages(self):
+        page_obj = Paginator(range(5), 1).page(3)
+        self.assertEqual(page_window(page_obj), [1, 2, 3, 4, 5])
+
+    def test_large_paginator_is_elided(self):
+        paginator = Paginator(range(100_000), POSTS_PER_PAGE)
+        windows = {
+            1: [1, 2, 3, None, 10_000],
+            500: [1, None, 498, 499, 500, 501, 502, None, 10_000],
+            10_000: [1, None, 9_998, 9_999, 10_000],
+        }
+        for number, expected in windows.items():
+            with self.subTest(number=number):
+                page_obj = paginator.page(number)
+                self.assertEqual(page_window(page_obj), expected)
+
+
+class SearchViewTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='searcher')
+        self.cats = Post.objects.create(
+            text='Кошки любят молоко', author=self.user
+        )
+        self.dogs = Post.objects.create(
+            text='Собаки любят кости, кости и ещё раз кости',
+            author=self.user,
+        )
+
+    def search(self, query):
+        response = self.client.get(reverse('posts:search'), {'q': query})
+        return list(response.context['page_obj'])
+
+    def test_search_finds_words_and_prefixes(self):
+        queries = {
+            'любят': {self.cats, self.dogs},
+            'кош': {self.cats},
+            'собаки кости': {self.dogs},
+            'жирафы': set(),
+            '': set(),
+        }
+        for query, expected in queries.items():
+            with self.subTest(query=query):
+                self.assertEqual(set(self.search(query)), expected)
+
+    def test_search_ranks_more_relevant_posts_first(self):
+        Post.objects.create(text='Где-то были кости', author=self.user)
+        self.assertEqual(self.search('кости')[0], self.dogs)
+
+    def test_search_ignores_query_syntax(self):
+        self.assertEqual(self.search('"любят OR (NEAR*'), [])
+        self.assertEqual(self.search('кошки!'), [self.cats])
+
+    def test_postgresql_search_uses_tsvector_index_not_like(self):
+        postgresql = mock.Mock(vendor='postgresql')
+        for sql in get_search_sql(postgresql):
+            with self.subTest(sql=sql):
+                self.assertIn("to_tsvector('russian', text) @@ query", sql)
+                self.assertNotIn('LIKE', sql.upper())
+        self.assertEqual(
+            build_tsquery('"кошки! OR (молоко'), 'кошки:* & OR:* & молоко:*'
+        )
+        with self.assertRaises(NotSupportedError):
+            get_search_sql(mock.Mock(vendor='mysql'))
+
+    def test_search_index_follows_edits_and_deletes(self):
+        self.cats.text = 'Кошки любят рыбу'
+        self.cats.save()
+        self.assertEqual(self.search('молоко'), [])
+        self.assertEqual(self.search('рыбу'), [self.cats])
+        self.cats.delete()
+        self.assertEqual(self.search('рыбу'), [])
+
+    def test_search_paginates_results(self):
+        Post.objects.bulk_create(
+            Post(text='Одинаковый текст', author=self.user)
+            for _ in range(TESTING_ATTEMPTS)
+        )
+        call_command('rebuild_search_index', stdout=StringIO())
+        response = self.client.get(
+            reverse('posts:search'), {'q': 'одинаковый', 'page': 2}
+        )
+        self.assertEqual(
+            len(response.context['page_obj']),
+            TESTING_ATTEMPTS % POSTS_PER_PAGE,
+        )
+        self.assertContains(response, '?q=%D0%BE%D0%B4%D0%B8')
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='conditional')
+        self.group = Group.objects.create(
+            title='Conditional', slug='conditional', description='-'
+        )
+        self.post = Post.objects.create(
+            text='Conditional post', author=self.user, group=self.group
+        )
+        self.urls = [
+            reverse('posts:index'),
+            reverse('posts:group_posts', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        ]
+
+    def test_unchanged_page_returns_not_modified(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertTrue(response.has_header('ETag'))
+                self.assertTrue(response.has_header('Last-Modified'))
+                repeated = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=response['ETag']
+                )
+                self.assertEqual(repeated.status_code, HTTPStatus.NOT_MODIFIED)
+                repeated = self.client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+                )
+                self.assertEqual(repeated.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_edited_post_changes_etag(self):
+        etags = {url: self.client.get(url)['ETag'] for url in self.urls}
+        self.post.text = 'Edited conditional post'
+        self.post.save()
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_etag_depends_on_user(self):
+        url = reverse('posts:index')
+        etag = self.client.get(url)['ETag']
+        self.client.force_login(self.user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+
+class FeedMarkerTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='marker')
+        self.group = Group.objects.create(
+            title='Marker', slug='marker', description='-'
+        )
+        self.other_group = Group.objects.create(
+            title='Other marker', slug='other-marker', description='-'
+        )
+        self.post = Post.objects.create(
+            text='Marked post', author=self.user, group=self.group
+        )
+        self.feeds = [
+            INDEX_FEED,
+            author_feed(self.user.pk),
+            group_feed(self.group.pk),
+            group_feed(self.other_group.pk),
+        ]
+
+    def get_markers(self):
+        return {key: get_feed_changed_at(key) for key in self.feeds}
+
+    def test_edit_moves_updated_at_and_markers(self):
+        created = self.get_markers()
+        self.assertEqual(created[INDEX_FEED], self.post.updated_at)
+        self.assertIsNone(created[group_feed(self.other_group.pk)])
+        self.post.group = self.other_group
+        self.post.save()
+        self.assertGreater(self.post.updated_at, self.post.pub_date)
+        edited = self.get_markers()
+        for key in self.feeds:
+            with self.subTest(key=key):
+                self.assertEqual(edited[key], self.post.updated_at)
+
+    def test_delete_moves_markers(self):
+        created = self.get_markers()
+        self.post.delete()
+        deleted = self.get_markers()
+        for key in self.feeds[:3]:
+            with self.subTest(key=key):
+                self.assertGreater(deleted[key], created[key])
+
+    def test_author_and_group_edits_move_markers(self):
+        created = self.get_markers()
+        self.user.last_name = 'Renamed'
+        self.user.save()
+        renamed = self.get_markers()
+        for key in self.feeds[:3]:
+            with self.subTest(key=key):
+                self.assertGreater(renamed[key], created[key])
+        self.assertIsNone(renamed[group_feed(self.other_group.pk)])
+        self.group.title = 'Renamed marker'
+        self.group.save()
+        moved = self.get_markers()
+        for key in self.feeds[:3]:
+            with self.subTest(key=key):
+                self.assertGreater(moved[key], renamed[key])
+
+    def test_group_delete_moves_markers(self):
+        created = self.get_markers()
+        etag = self.client.get(reverse('posts:index'))['ETag']
+        self.group.delete()
+        deleted = self.get_markers()
+        for key in self.feeds[:2]:
+            with self.subTest(key=key):
+                self.assertGreater(deleted[key], created[key])
+        response = self.client.get(
+            reverse('posts:index'), HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_login_keeps_markers(self):
+        created = self.get_markers()
+        self.client.force_login(self.user)
+        self.assertEqual(self.get_markers(), created)
+
+    def test_edit_moves_last_modified(self):
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        last_modified = self.client.get(url)['Last-Modified']
+        with mock.patch(
+            'django.utils.timezone.now',
+            return_value=self.post.updated_at + timedelta(minutes=1),
+        ):
+            self.post.save()
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+
+class ExportTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='exporter')
+        self.group = Group.objects.create(
+            title='Export', slug='export', description='-'
+        )
+        self.group_post = Post.objects.create(
+            text='Пост, с "кавычками"', author=self.user, group=self.group
+        )
+        self.other_post = Post.objects.create(
+            text='Другой пост', author=self.user
+        )
+        self.admin = User.objects.create_user(
+            username='staff', is_staff=True
+        )
+
+    def test_command_exports_ndjson_with_filters(self):
+        out = StringIO()
+        call_command('export_posts', group=self.group.slug, stdout=out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(rows, [{
+            'id': self.group_post.pk,
+            'text': self.group_post.text,
+            'pub_date': self.group_post.pub_date.isoformat(),
+            'author': self.user.username,
+            'group': self.group.slug,
+        }])
+
+    def test_command_exports_csv_by_date_range(self):
+        out = StringIO()
+        tomorrow = (self.other_post.pub_date + timedelta(days=1)).date()
+        call_command(
+            'export_posts', format='csv', until=tomorrow.isoformat(),
+            stdout=out,
+        )
+        rows = list(csv.reader(StringIO(out.getvalue())))
+        self.assertEqual(rows[0], ['id', 'text', 'pub_date', 'author',
+                                   'group'])
+        self.assertEqual(
+            [row[1] for row in rows[1:]],
+            [self.group_post.text, self.other_post.text],
+        )
+        out = StringIO()
+        call_command(
+            'export_posts', format='csv', since=tomorrow.isoformat(),
+            stdout=out,
+        )
+        self.assertEqual(len(out.getvalue().splitlines()), 1)
+
+    def test_export_view_is_for_staff_only(self):
+        url = reverse('posts:export')
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url).status_code, HTTPStatus.FOUND)
+        self.client.force_login(self.admin)
+        response = self.client.get(url, {'format': 'csv', 'author': 'staff'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        content = b''.join(response.streaming_content).decode()
+        self.assertEqual(len(content.splitlines()), 1)
+        response = self.client.get(url, {'since': 'yesterday'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+
+class ImportTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='importer')
+        self.group = Group.objects.create(
+            title='Import', slug='import', description='-'
+        )
+        self.rows = [
+            {'text': 'Старый пост', 'author': 'importer', 'group': 'import',
+             'pub_date': '2020-01-02T03:04:05+00:00'},
+            {'text': 'Пост нового автора', 'author': 'newcomer',
+             'group': 'new-group', 'pub_date': '2021-01-01'},
+            {'text': 'Без группы', 'author': 'newcomer', 'group': None,
+             'pub_date': '2022-01-01T00:00:00'},
+        ]
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def write_source(self, name, content):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, 'w', encoding='utf-8', newline='') as source:
+            source.write(content)
+        return path
+
+    def test_import_ndjson_creates_posts_authors_and_groups(self):
+        path = self.write_source('posts.ndjson', '\n'.join(
+            json.dumps(row, ensure_ascii=False) for row in self.rows
+        ))
+        out = StringIO()
+        call_command('import_posts', path, batch_size=2, stdout=out)
+        self.assertIn('rows/s', out.getvalue())
+        newcomer = User.objects.get(username='newcomer')
+        self.assertFalse(newcomer.has_usable_password())
+        old_post = Post.objects.get(text='Старый пост')
+        self.assertEqual(old_post.group, self.group)
+        self.assertEqual(old_post.pub_date.year, 2020)
+        self.assertEqual(old_post.updated_at, old_post.pub_date)
+        self.assertEqual(get_author_posts_count(newcomer), 2)
+        self.assertEqual(Group.objects.get(slug='new-group').posts_count, 1)
+        self.assertEqual(
+            get_feed_changed_at(author_feed(newcomer.pk)).year, 2022
+        )
+        response = self.client.get(reverse('posts:search'), {'q': 'старый'})
+        self.assertEqual(list(response.context['page_obj']), [old_post])
+
+    def test_export_import_roundtrip_in_csv(self):
+        for row in self.rows[:1]:
+            Post.objects.create(
+                text=row['text'], author=self.user, group=self.group
+            )
+        out = StringIO()
+        call_command('export_posts', format='csv', stdout=out)
+        Post.objects.all().delete()
+        path = self.write_source('posts.csv', out.getvalue())
+        call_command('import_posts', path, format='csv', stdout=StringIO())
+        self.assertEqual(
+            list(Post.objects.values_list('text', 'author', 'group')),
+            [('Старый пост', self.user.pk, self.group.pk)],
+        )
+
+    def test_broken_row_raises_command_error(self):
+        path = self.write_source('broken.ndjson', '{"text": "no author"}')
+        with self.assertRaises(CommandError):
+            call_command('import_posts', path, stdout=StringIO())
+
+    def test_rows_before_broken_one_are_finished(self):
+        path = self.write_source('partly.ndjson', '\n'.join([
+            *(json.dumps(row, ensure_ascii=False) for row in self.rows),
+            '{"text": "no author"}',
+        ]))
+        with self.assertRaises(CommandError):
+            call_command('import_posts', path, batch_size=2, stdout=StringIO())
+        # Вторая пачка с битой строкой не записана, первая — целиком
+        newcomer = User.objects.get(username='newcomer')
+        self.assertEqual(get_author_posts_count(newcomer), 1)
+        response = self.client.get(reverse('posts:search'), {'q': 'старый'})
+        self.assertEqual(len(response.context['page_obj']), 1)
+        self.assertEqual(
+            [post.pub_date.year for post in Post.objects.all()],
+            [2021, 2020],
+        )
+        newcomer.delete()
+        self.assertEqual(get_author_posts_count(self.user), 1)
+
+
+class FollowTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='followed')
+        self.reader = User.objects.create_user(username='reader')
+        self.stranger = User.objects.create_user(username='stranger')
+        self.old_post = Post.objects.create(
+            text='Пост до подписки', author=self.author
+        )
+        self.client.force_login(self.reader)
+
+    def follow(self, author=None):
+        author = author or self.author
+        return self.client.get(
+            reverse('posts:profile_follow', args=[author.username])
+        )
+
+    def feed_texts(self, user=None):
+        client = self.client
+        if user is not None:
+            client = Client()
+            client.force_login(user)
+        response = client.get(reverse('posts:follow_index'))
+        return [post.text for post in response.context['page_obj']]
+
+    def test_follow_and_unfollow(self):
+        profile_url = reverse('posts:profile', args=[self.author.username])
+        self.assertContains(self.client.get(profile_url), 'Подписаться')
+        self.assertRedirects(self.follow(), profile_url)
+        self.follow()
+        self.assertEqual(
+            Follow.objects.filter(user=self.reader, author=self.author)
+            .count(),
+            1,
+        )
+        self.assertEqual(get_followers_count(self.author.id), 1)
+        self.assertContains(self.client.get(profile_url), 'Отписаться')
+        self.client.get(
+            reverse('posts:profile_unfollow', args=[self.author.username])
+        )
+        self.assertFalse(Follow.objects.exists())
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(get_followers_count(self.author.id), 0)
+
+    def test_delete_user_with_followers_and_follows(self):
+        self.follow()
+        Follow.objects.create(user=self.stranger, author=self.reader)
+        Follow.objects.create(user=self.author, author=self.reader)
+        self.reader.delete()
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(get_followers_count(self.author.id), 0)
+        self.assertFalse(
+            AuthorCounter.objects.filter(author_id=self.reader.id).exists()
+        )
+
+    def test_cannot_follow_yourself(self):
+        self.follow(self.reader)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_new_post_is_pushed_to_followers_only(self):
+        self.follow()
+        self.assertEqual(self.feed_texts(), ['Пост до подписки'])
+        Post.objects.create(text='Новый пост', author=self.author)
+        self.assertEqual(
+            self.feed_texts(), ['Новый пост', 'Пост до подписки']
+        )
+        self.assertEqual(self.feed_texts(self.stranger), [])
+
+    def test_deleted_post_leaves_timeline(self):
+        self.follow()
+        self.old_post.delete()
+        self.assertEqual(self.feed_texts(), [])
+
+    @override_settings(POSTS_FANOUT_LIMIT=1)
+    def test_popular_author_posts_are_pulled_on_read(self):
+        regular = User.objects.create_user(username='regular')
+        self.follow()
+        Follow.objects.create(user=self.stranger, author=self.author)
+        Follow.objects.create(user=self.reader, author=regular)
+        Post.objects.create(text='Обычный автор', author=regular)
+        Post.objects.create(text='Популярный автор', author=self.author)
+        # У популярного автора больше POSTS_FANOUT_LIMIT подписчиков
+        self.assertFalse(TimelineEntry.objects.filter(
+            post__text='Популярный автор'
+        ).exists())
+        timeline = FollowTimeline(self.reader)
+        self.assertEqual(timeline.count(), 3)
+        self.assertEqual(
+            [post.text for post in timeline[0:10]],
+            ['Популярный автор', 'Обычный автор', 'Пост до подписки'],
+        )
+        self.assertEqual(
+            [post.text for post in timeline[1:2]], ['Обычный автор']
+        )
+
+    def test_follow_index_requires_login(self):
+        url = reverse('posts:follow_index')
+        response = Client().get(url)
+        self.assertRedirects(response, f'/auth/login/?next={url}')
+
+
+class FeedTableTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='feed_author')
+        self.group = Group.objects.create(
+            title='Feed group', slug='feed-group', description='-'
+        )
+
+    def make_old(self, post, days):
+        Post.objects.filter(pk=post.pk).update(
+            pub_date=post.pub_date - timedelta(days=days)
+        )
+        post.refresh_from_db()
+        post.save()
+        return post
+
+    def test_entry_follows_post_changes(self):
+        post = Post.objects.create(
+            text='Пост в ленте', author=self.author, group=self.group
+        )
+        self.assertEqual(post.feed_entry.group, self.group)
+        self.assertEqual(post.feed_entry.pub_date, post.pub_date)
+        post.group = None
+        post.save()
+        post.feed_entry.refresh_from_db()
+        self.assertIsNone(post.feed_entry.group)
+        post.delete()
+        self.assertFalse(Post.objects.exists())
+        self.assertEqual(MaterializedFeed().count(), 0)
+
+    @override_settings(POSTS_FEED_HORIZON_DAYS=30)
+    def test_posts_beyond_horizon_are_read_from_posts_table(self):
+        old_post = self.make_old(Post.objects.create(
+            text='Старый пост', author=self.author, group=self.group
+        ), days=60)
+        new_post = Post.objects.create(
+            text='Новый пост', author=self.author, group=self.group
+        )
+        # Новый пост подрезал таблицу: старого в ней уже нет
+        self.assertEqual(trim_feed(), 0)
+        self.assertFalse(
+            FeedEntry.objects.filter(post=old_post).exists()
+        )
+        for feed in (MaterializedFeed(), MaterializedFeed(self.group.pk)):
+            with self.subTest(group_id=feed.group_id):
+                self.assertEqual(feed.table_count(), 1)
+                self.assertEqual(feed.count(), 2)
+                self.assertEqual(feed[0:10], [new_post, old_post])
+                self.assertEqual(feed[1:2], [old_post])
+        cache.clear()
+        response = self.client.get(reverse('posts:index'), {'page': 1})
+        self.assertEqual(
+            list(response.context['page_obj']), [new_post, old_post]
+        )
+
+    @override_settings(POSTS_FEED_HORIZON_DAYS=None)
+    def test_without_horizon_table_keeps_every_post(self):
+        self.make_old(Post.objects.create(
+            text='Старый пост', author=self.author
+        ), days=3650)
+        Post.objects.create(text='Новый пост', author=self.author)
+        feed = MaterializedFeed()
+        self.assertEqual(feed.table_count(), 2)
+        self.assertEqual(feed.older_count(), 0)
+        self.assertEqual(rebuild_feed_table(), 2)
+
+
+@override_settings(POSTS_EXCERPT_LENGTH=50)
+class FeedExcerptTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='long_author')
+        self.group = Group.objects.create(
+            title='Long group', slug='long-group', description='-'
+        )
+        self.long_text = 'Длинный пост. ' * 500
+        self.long_post = Post.objects.create(
+            text=self.long_text, author=self.author, group=self.group
+        )
+        self.short_post = Post.objects.create(
+            text='Короткий пост', author=self.author, group=self.group
+        )
+        self.client.force_login(self.author)
+        Follow.objects.create(
+            user=User.objects.create_user(username='long_reader'),
+            author=self.author,
+        )
+
+    def test_feeds_show_excerpt_without_reading_text(self):
+        reader = Client()
+        reader.force_login(User.objects.get(username='long_reader'))
+        detail_url = reverse('posts:post_detail', args=[self.long_post.pk])
+        urls = {
+            reverse('posts:index'): self.client,
+            reverse('posts:group_posts', args=[self.group.slug]):
+                self.client,
+            reverse('posts:profile', args=[self.author.username]):
+                self.client,
+            reverse('posts:search') + '?q=пост': self.client,
+            reverse('posts:follow_index'): reader,
+        }
+        for url, client in urls.items():
+            with self.subTest(url=url):
+                cache.clear()
+                with CaptureQueriesContext(connection) as queries:
+                    response = client.get(url)
+                self.assertContains(response, 'Короткий пост')
+                self.assertContains(response, self.long_post.excerpt)
+                self.assertNotContains(response, self.long_text)
+                self.assertContains(
+                    response, f'href="{detail_url}">читать дальше', count=1
+                )
+                self.assertFalse([
+                    query['sql'] for query in queries
+                    if query['sql'].startswith('SELECT')
+                    and '"posts_post"."text"' in query['sql'].split(
+                        ' FROM '
+                    )[0]
+                ])
+        response = self.client.get(detail_url)
+        self.assertContains(response, self.long_text)
+
+
+class PostFragmentCacheTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='fragment')
+        self.post = Post.objects.create(
+            text='Первая строка\nвторая строка', author=self.author
+        )
+        cache.clear()
+
+    def test_detail_shows_stored_html(self):
+        Post.objects.filter(pk=self.post.pk).update(
+            text_html='<b>Готовый HTML</b>', heading_html='Готовый заголовок'
+        )
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk])
+        )
+        self.assertContains(response, '<b>Готовый HTML</b>', html=True)
+        self.assertContains(response, 'Пост Готовый заголовок')
+
+    def test_feed_reuses_post_fragment_until_post_changes(self):
+        url = reverse('posts:index')
+        self.assertContains(self.client.get(url), 'Первая строка')
+        # Лента сброшена, но сам пост не менялся: фрагмент берётся из кэша
+        Post.objects.filter(pk=self.post.pk).update(excerpt='Подмена')
+        bump_feed_version()
+        self.assertContains(self.client.get(url), 'Первая строка')
+        self.post.text = 'Новый текст'
+        self.post.save()
+        response = self.client.get(url)
+        self.assertContains(response, 'Новый текст')
+        self.assertNotContains(response, 'Первая строка')
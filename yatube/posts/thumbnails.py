@@ -0,0 +1,112 @@
+import logging
+
+from django.conf import settings
+from django.utils import timezone
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+
+from .cache import bump_feed_version
+from .markers import post_feeds, touch_feeds
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# Для каждого места показа — размеры для srcset (обычный экран и вдвое
+# плотнее), опции sorl и атрибут sizes. Воркер и шаблоны берут размеры
+# отсюда, поэтому ключи миниатюр в key-value хранилище совпадают.
+THUMBNAILS = {
+    'feed': {
+        'geometries': ('480x270', '960x540'),
+        'options': {'crop': 'center'},
+        'sizes': '(max-width: 576px) 100vw, 480px',
+    },
+    'detail': {
+        'geometries': ('960', '1920'),
+        'options': {'upscale': False},
+        'sizes': '(max-width: 992px) 100vw, 960px',
+    },
+}
+
+
+def get_post_thumbnails(post, kind):
+    """Миниатюры картинки поста для места показа kind, от меньшей."""
+    thumbnail = THUMBNAILS[kind]
+    return [
+        get_thumbnail(post.image, geometry, **thumbnail['options'])
+        for geometry in thumbnail['geometries']
+    ]
+
+
+def find_thumbnail(source, geometry, options):
+    """Готовая миниатюра из key-value хранилища sorl или None.
+
+    Имя строится так же, как в ThumbnailBackend.get_thumbnail, но без
+    создания файла: в запросе миниатюры не пережимаются.
+    """
+    backend = default.backend
+    options = dict(options)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    name = backend._get_thumbnail_filename(source, geometry, options)
+    return default.kvstore.get(ImageFile(name, default.storage))
+
+
+def find_post_thumbnails(post, kind):
+    """Готовые миниатюры поста для kind или None, если какой-то нет."""
+    thumbnail = THUMBNAILS[kind]
+    source = ImageFile(post.image)
+    thumbnails = [
+        find_thumbnail(source, geometry, thumbnail['options'])
+        for geometry in thumbnail['geometries']
+    ]
+    return None if None in thumbnails else thumbnails
+
+
+def make_thumbnails(post):
+    """Создаёт все миниатюры поста и отмечает результат в посте."""
+    try:
+        for kind in THUMBNAILS:
+            for thumbnail in get_post_thumbnails(post, kind):
+                # Битый исходник sorl только логирует, не создав файла
+                if not thumbnail.exists():
+                    raise OSError(f'Миниатюра {thumbnail.name} не создана')
+    except Exception:
+        logger.exception('Не удалось сделать миниатюры поста %s', post.pk)
+        status = Post.THUMBNAILS_FAILED
+    else:
+        status = Post.THUMBNAILS_READY
+    # Пока воркер работал, автор мог загрузить другую картинку: статус
+    # пишется, только если в посте всё ещё обработанный файл
+    updated = Post.objects.filter(pk=post.pk, image=post.image.name).update(
+        thumbnail_status=status, updated_at=timezone.now()
+    )
+    if not updated:
+        return False
+    post.thumbnail_status = status
+    touch_feeds(post_feeds(post.author_id, post.group_id))
+    bump_feed_version()
+    return post.thumbnails_ready
+
+
+def process_pending_thumbnails(batch_size=None):
+    """Один проход воркера: миниатюры для ещё не обработанных картинок.
+
+    Возвращает число обработанных постов.
+    """
+    batch_size = batch_size or settings.POSTS_THUMBNAIL_BATCH_SIZE
+    posts = Post.objects.filter(
+        thumbnail_status=Post.THUMBNAILS_PENDING
+    ).exclude(image='').order_by('pk')[:batch_size]
+    processed = 0
+    for post in posts:
+        make_thumbnails(post)
+        processed += 1
+    return processed
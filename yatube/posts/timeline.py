@@ -0,0 +1,149 @@
+from heapq import merge
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.functional import cached_property
+
+from core.routers import use_primary
+
+from .models import AuthorCounter, Follow, Post, TimelineEntry
+
+
+def get_followers_count(author_id):
+    return AuthorCounter.objects.filter(author_id=author_id).values_list(
+        'followers_count', flat=True
+    ).first() or 0
+
+
+def is_pull_author(followers_count):
+    """Автор с огромной аудиторией: его посты не раскладываются по лентам,
+    а подмешиваются при чтении.
+    """
+    return followers_count > settings.POSTS_FANOUT_LIMIT
+
+
+def fan_out_post(post):
+    """Записывает новый пост в ленты подписчиков автора пачками."""
+    followers_count = get_followers_count(post.author_id)
+    if not followers_count or is_pull_author(followers_count):
+        return 0
+    follower_ids = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True).iterator()
+    written = 0
+    while True:
+        batch = list(islice(follower_ids, settings.POSTS_FANOUT_BATCH_SIZE))
+        if not batch:
+            return written
+        TimelineEntry.objects.bulk_create(
+            [
+                TimelineEntry(
+                    user_id=user_id,
+                    post_id=post.pk,
+                    author_id=post.author_id,
+                    pub_date=post.pub_date,
+                )
+                for user_id in batch
+            ],
+            ignore_conflicts=True,
+        )
+        written += len(batch)
+
+
+def backfill_timeline(user_id, author_id):
+    """Новому подписчику сразу видны последние посты автора."""
+    if is_pull_author(get_followers_count(author_id)):
+        return
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'pk', 'pub_date'
+    )[:settings.POSTS_TIMELINE_BACKFILL]
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(
+                user_id=user_id,
+                post_id=post_id,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+            for post_id, pub_date in posts
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def drop_from_timeline(user_id, author_id):
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+@use_primary()
+def rebuild_timelines():
+    """Заново раскладывает посты по лентам, например после импорта."""
+    follows = Follow.objects.values_list('user_id', 'author_id')
+    with transaction.atomic():
+        TimelineEntry.objects.all().delete()
+        for user_id, author_id in follows.iterator():
+            backfill_timeline(user_id, author_id)
+    return TimelineEntry.objects.count()
+
+
+class FollowTimeline:
+    """Лента постов авторов, на которых подписан пользователь.
+
+    Обычные авторы читаются из материализованной ленты одним диапазоном
+    по индексу (user, -pub_date). Посты авторов с огромной аудиторией
+    (см. is_pull_author) читаются из posts_post и сливаются по дате.
+    Как и SearchResults, поддерживает count() и срезы для Paginator.
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    @cached_property
+    def pull_author_ids(self):
+        return list(Follow.objects.filter(
+            user=self.user,
+            author__post_counter__followers_count__gt=(
+                settings.POSTS_FANOUT_LIMIT
+            ),
+        ).values_list('author_id', flat=True))
+
+    def entries(self):
+        entries = TimelineEntry.objects.filter(user=self.user).order_by(
+            '-pub_date', '-post_id'
+        )
+        if self.pull_author_ids:
+            # Записи, сделанные до того, как автор стал «тяжёлым»
+            entries = entries.exclude(author_id__in=self.pull_author_ids)
+        return entries
+
+    def pulled_posts(self):
+        return Post.objects.filter(author_id__in=self.pull_author_ids)
+
+    def count(self):
+        count = self.entries().count()
+        if self.pull_author_ids:
+            count += self.pulled_posts().count()
+        return count
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        if self.pull_author_ids:
+            keys = merge(
+                self.entries().values_list('pub_date', 'post_id')[
+                    :index.stop
+                ],
+                self.pulled_posts().values_list('pub_date', 'pk')[
+                    :index.stop
+                ],
+                reverse=True,
+            )
+            ids = [post_id for _, post_id in list(keys)[start:index.stop]]
+        else:
+            ids = list(self.entries().values_list('post_id', flat=True)[
+                start:index.stop
+            ])
+        posts = Post.objects.for_feed().in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
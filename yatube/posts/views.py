@@ -1,55 +1,163 @@
 from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
-
+from django.utils.functional import SimpleLazyObject
+from django.utils.http import urlencode
+
+from core.routers import writes_to_primary
+
+from .cache import get_feed_version
+from .conditional import (conditional_page, group_last_modified,
+                          index_last_modified, post_last_modified,
+                          profile_last_modified)
+from .counters import get_author_posts_count
+from .export import CONTENT_TYPES, export_lines, filter_posts
+from .feed import MaterializedFeed
 from .forms import PostForm
-from .models import Group, Post, User
+from .models import Follow, Group, Post, User
+from .paginators import CursorPaginator
+from .search import SearchResults
+from .timeline import FollowTimeline
 
 POSTS_PER_PAGE = settings.POSTS_PER_PAGE
 
 
-def get_page_context(queryset, request):
-    paginator = Paginator(queryset, POSTS_PER_PAGE)
+def use_cursor_pagination(request):
+    if 'after' in request.GET or 'before' in request.GET:
+        return True
+    if 'page' in request.GET:
+        return False
+    return settings.POSTS_CURSOR_PAGINATION
+
+
+def get_page_context(queryset, request, feed=None):
+    # page_obj ленивый: при попадании во фрагментный кэш запросов к БД нет
+    feed_context = {
+        'feed_version': get_feed_version(),
+        'feed_cache_timeout': settings.POSTS_CACHE_TIMEOUT,
+    }
+    if use_cursor_pagination(request):
+        after = request.GET.get('after')
+        before = request.GET.get('before')
+        paginator = CursorPaginator(queryset, POSTS_PER_PAGE)
+        feed_context.update({
+            'paginator': paginator,
+            'page_number': None,
+            'page_key': f'after={after}&before={before}',
+            'page_obj': SimpleLazyObject(
+                lambda: paginator.get_page(after=after, before=before)
+            ),
+        })
+        return feed_context
+    # Номерные страницы общей ленты и групп читаются из FeedEntry
+    paginator = Paginator(
+        queryset if feed is None else feed, POSTS_PER_PAGE
+    )
     page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    return {
+    feed_context.update({
         'paginator': paginator,
         'page_number': page_number,
-        'page_obj': page_obj,
-    }
+        'page_key': f'page={page_number}',
+        'page_obj': SimpleLazyObject(
+            lambda: paginator.get_page(page_number)
+        ),
+    })
+    return feed_context
 
 
+@conditional_page(index_last_modified)
 def index(request):
-    context = get_page_context(Post.objects.all(), request)
+    context = get_page_context(
+        Post.objects.for_feed(), request, MaterializedFeed()
+    )
     return render(request, 'posts/index.html', context)
 
 
+@conditional_page(group_last_modified)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
     context = {
         'group': group,
-        'posts': posts,
     }
-    context.update(get_page_context(group.posts.all(), request))
+    context.update(get_page_context(
+        group.posts.for_feed(), request, MaterializedFeed(group.pk)
+    ))
     return render(request, 'posts/group_list.html', context)
 
 
+@conditional_page(profile_last_modified)
 def profile(request, username):
     author = get_object_or_404(User, username=username)
-    post_count = Post.objects.select_related('author').count()
+    post_count = get_author_posts_count(author)
+    following = (
+        request.user.is_authenticated
+        and request.user != author
+        and Follow.objects.filter(user=request.user, author=author).exists()
+    )
     context = {
         'author': author,
-        'post_count': post_count
+        'post_count': post_count,
+        'following': following,
     }
-    context.update(get_page_context(author.posts.all(), request))
+    context.update(get_page_context(author.posts.for_feed(), request))
     return render(request, 'posts/profile.html', context)
 
 
+def search(request):
+    query = request.GET.get('q', '').strip()
+    paginator = Paginator(SearchResults(query), POSTS_PER_PAGE)
+    page_number = request.GET.get('page')
+    context = {
+        'query': query,
+        'extra_query': urlencode({'q': query}),
+        'feed_cache_timeout': settings.POSTS_CACHE_TIMEOUT,
+        'paginator': paginator,
+        'page_number': page_number,
+        'page_obj': paginator.get_page(page_number),
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@login_required
+def follow_index(request):
+    paginator = Paginator(FollowTimeline(request.user), POSTS_PER_PAGE)
+    page_number = request.GET.get('page')
+    context = {
+        'feed_cache_timeout': settings.POSTS_CACHE_TIMEOUT,
+        'paginator': paginator,
+        'page_number': page_number,
+        'page_obj': paginator.get_page(page_number),
+    }
+    return render(request, 'posts/follow.html', context)
+
+
+@writes_to_primary
+@login_required
+def profile_follow(request, username):
+    author = get_object_or_404(User, username=username)
+    if author != request.user:
+        Follow.objects.get_or_create(user=request.user, author=author)
+    return redirect('posts:profile', username=username)
+
+
+@writes_to_primary
+@login_required
+def profile_unfollow(request, username):
+    Follow.objects.filter(
+        user=request.user, author__username=username
+    ).delete()
+    return redirect('posts:profile', username=username)
+
+
+@conditional_page(post_last_modified)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    post_count = Post.objects.select_related('author').count()
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'), pk=post_id
+    )
+    post_count = get_author_posts_count(post.author_id)
     context = {
         'post': post,
         'post_count': post_count,
@@ -60,7 +168,7 @@ def post_detail(request, post_id):
 @login_required
 def post_create(request):
     template = 'posts/create_post.html'
-    form = PostForm(request.POST or None)
+    form = PostForm(request.POST or None, files=request.FILES or None)
     if form.is_valid():
         new_post = form.save(commit=False)
         new_post.author = request.user
@@ -76,9 +184,11 @@ def post_create(request):
 @login_required
 def post_edit(request, post_id):
     post = get_object_or_404(Post, id=post_id)
-    if post.author != request.user:
+    if post.author_id != request.user.id:
         return redirect('posts:post_detail', post_id)
-    form = PostForm(request.POST or None, instance=post)
+    form = PostForm(
+        request.POST or None, files=request.FILES or None, instance=post
+    )
     if form.is_valid():
         form.save()
         return redirect('posts:post_detail',
@@ -89,3 +199,27 @@ def post_edit(request, post_id):
         'is_edit': True,
     }
     return render(request, 'posts/create_post.html', context)
+
+
+@staff_member_required
+def export(request):
+    export_format = request.GET.get('format', 'ndjson')
+    if export_format not in CONTENT_TYPES:
+        return HttpResponseBadRequest('Неизвестный формат выгрузки')
+    try:
+        queryset = filter_posts(
+            group=request.GET.get('group'),
+            author=request.GET.get('author'),
+            since=request.GET.get('since'),
+            until=request.GET.get('until'),
+        )
+    except ValueError as error:
+        return HttpResponseBadRequest(str(error))
+    response = StreamingHttpResponse(
+        export_lines(queryset, export_format),
+        content_type=CONTENT_TYPES[export_format],
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="posts.{export_format}"'
+    )
+    return response
@@ -0,0 +1,31 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from core.testing import QueryBudgetMixin, query_budget
+
+User = get_user_model()
+
+
+class UsersQueryBudgetTest(QueryBudgetMixin, TestCase):
+    def test_every_url_fits_query_budget(self):
+        self.assertUrlBudgets('users.urls', {
+            'logout': (reverse('users:logout'), 0),
+            'signup': (reverse('users:signup'), 0),
+            'login': (reverse('users:login'), 0),
+        })
+
+    @query_budget(2)
+    def test_signup_fits_query_budget(self):
+        # Проверка уникальности имени и вставка пользователя
+        response = self.client.post(reverse('users:signup'), {
+            'first_name': 'Новый',
+            'last_name': 'Автор',
+            'username': 'new_author',
+            'email': 'new@example.com',
+            'password1': 'Sup3r-secret-pass',
+            'password2': 'Sup3r-secret-pass',
+        })
+        self.assertRedirects(
+            response, reverse('posts:index'), fetch_redirect_response=False
+        )
@@ -32,9 +32,11 @@ ALLOWED_HOSTS = []
 
 INSTALLED_APPS = [
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'core.apps.CoreConfig',
     'users.apps.UsersConfig',
     'posts.apps.PostsConfig',
+    'sorl.thumbnail',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -44,6 +46,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestMetricsMiddleware',
+    'core.middleware.PrimaryPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -55,7 +59,33 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'yatube.urls'
 
+# Метрики запросов: Server-Timing и гистограммы на /metrics/ для staff
+REQUEST_METRICS = os.getenv('REQUEST_METRICS') == '1'
+
 POSTS_PER_PAGE = 10
+# Ленты по ключу (?after=/?before=) вместо номеров страниц
+POSTS_CURSOR_PAGINATION = False
+# Сколько секунд живут закэшированные фрагменты лент
+POSTS_CACHE_TIMEOUT = 60 * 15
+# Наибольший размер картинки к посту в байтах
+POSTS_IMAGE_MAX_SIZE = 10 * 1024 * 1024
+# Сколько картинок воркер миниатюр обрабатывает за один проход
+POSTS_THUMBNAIL_BATCH_SIZE = 50
+# Сколько символов текста поста показывать в лентах
+POSTS_EXCERPT_LENGTH = 300
+# Сколько дней посты живут в узкой таблице общей ленты и лент групп;
+# None — хранить все
+POSTS_FEED_HORIZON_DAYS = 365
+# Лента подписок: посты авторов, у которых подписчиков больше
+# POSTS_FANOUT_LIMIT, не раскладываются по лентам, а читаются при показе
+POSTS_FANOUT_LIMIT = 10_000
+POSTS_FANOUT_BATCH_SIZE = 1000
+# Сколько последних постов автора попадает в ленту нового подписчика
+POSTS_TIMELINE_BACKFILL = 100
+# Статичные страницы about: кэш страницы и max-age для анонимов
+ABOUT_CACHE_TIMEOUT = 60 * 60 * 24
+# Наибольший размер страницы JSON API
+API_MAX_LIMIT = 1000
 
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
@@ -68,7 +98,8 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates с замером рендера для REQUEST_METRICS
+        'BACKEND': 'core.metrics.TimedDjangoTemplates',
         # Добавлено: Искать шаблоны на уровне проекта
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
@@ -83,16 +114,80 @@ TEMPLATES = [
     }
 ]
 
+# Прогрев шаблонов при старте имеет смысл только с кэширующим загрузчиком
+TEMPLATES_WARM_UP = False
+
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
-DATABASES = {
+DB_ENGINE = os.getenv('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('POSTGRES_DB', 'yatube'),
+            'USER': os.getenv('POSTGRES_USER', 'yatube'),
+            'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
+            'HOST': os.getenv('DB_HOST', 'localhost'),
+            'PORT': os.getenv('DB_PORT', '5432'),
+            # Постоянные соединения: не открывать новое на каждый запрос
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+            # За PgBouncer в режиме transaction серверные курсоры не работают
+            'DISABLE_SERVER_SIDE_CURSORS': os.getenv('DB_POOLER') == 'pgbouncer',
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('SQLITE_PATH', os.path.join(BASE_DIR, 'db.sqlite3')),
+            'OPTIONS': {
+                # Сколько секунд ждать освобождения блокировки записи
+                'timeout': int(os.getenv('SQLITE_TIMEOUT', 20)),
+            },
+        }
+    }
+
+# Реплика для чтения: DB_REPLICA_HOST для PostgreSQL,
+# SQLITE_REPLICA_PATH для локальной проверки на двух файлах SQLite
+DB_REPLICA_HOST = os.getenv('DB_REPLICA_HOST')
+SQLITE_REPLICA_PATH = os.getenv('SQLITE_REPLICA_PATH')
+if DB_ENGINE == 'postgresql' and DB_REPLICA_HOST:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': DB_REPLICA_HOST,
+        'PORT': os.getenv('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+elif DB_ENGINE != 'postgresql' and SQLITE_REPLICA_PATH:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': SQLITE_REPLICA_PATH,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
+
+# Сколько секунд после записи чтения клиента идут на primary
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 10))
+REPLICA_PIN_COOKIE = 'primary_pin'
+
+# Выполняются на каждом новом соединении с SQLite (см. core.db)
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'temp_store': 'MEMORY',
+    'cache_size': -20000,
+    'mmap_size': 128 * 1024 * 1024,
+}
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
@@ -134,3 +229,16 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/2.2/howto/static-files/
 
 STATIC_URL = '/static/'
+
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Загрузки сразу пишутся кусками во временный файл, а не в память
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+# Миниатюры лежат на диске в MEDIA_ROOT/cache, их имена и размеры —
+# в key-value хранилище sorl: кэш поверх таблицы в БД
+THUMBNAIL_KVSTORE = 'sorl.thumbnail.kvstores.cached_db_kvstore.KVStore'
+THUMBNAIL_PRESERVE_FORMAT = True
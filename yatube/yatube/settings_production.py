@@ -0,0 +1,55 @@
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .settings import *  # noqa: F401,F403
+from .settings import TEMPLATES
+
+SECRET_KEY = os.environ['SECRET_KEY']
+
+DEBUG = False
+
+ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', '').split()
+
+# Шаблоны читаются с диска и разбираются один раз на процесс
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'APP_DIRS': False,
+    'OPTIONS': {
+        **TEMPLATES[0]['OPTIONS'],
+        'loaders': [
+            ('django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ]),
+        ],
+    },
+}]
+
+# Скомпилировать все шаблоны из templates/ при старте WSGI-процесса
+TEMPLATES_WARM_UP = True
+
+# Кэш общий для всех процессов: версия лент (posts.cache) и key-value
+# хранилище sorl должны доходить до каждого воркера. По умолчанию —
+# таблица в БД (manage.py createcachetable), CACHE_BACKEND=memcached —
+# memcached по адресам из CACHE_LOCATION (нужен python-memcached).
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'db')
+if CACHE_BACKEND == 'memcached':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+            'LOCATION': os.getenv('CACHE_LOCATION', '127.0.0.1:11211').split(),
+        }
+    }
+elif CACHE_BACKEND == 'db':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': os.getenv('CACHE_LOCATION', 'yatube_cache'),
+        }
+    }
+else:
+    raise ImproperlyConfigured(
+        f'CACHE_BACKEND={CACHE_BACKEND}: нужен общий кэш, db или memcached'
+    )
+THUMBNAIL_CACHE = 'default'